@@ -0,0 +1,53 @@
+"""Keyword matching: the word-level automaton against per-keyword substring loops.
+
+The loops are what classify_document_type, assess_risk, generate_summary and
+generate_recommendations did before the automaton: one `word in text.lower()`
+per keyword over the whole document, answering presence only. The automaton
+reports every hit with its offset, on word boundaries.
+
+    python ClauseWise/benchmarks/bench_keywords.py --sizes 1KB 1MB 10MB 50MB
+"""
+import argparse
+import time
+
+from corpus import parse_size, synthetic_contract
+
+import main
+
+
+def substring_loops(text: str, keywords) -> set:
+    text_lower = text.lower()
+    return {keyword for keyword in keywords if keyword in text_lower}
+
+
+def best_of(repeat: int, function, *args) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["1KB", "100KB", "1MB", "10MB", "50MB"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    automaton = main.analyzer.scanner.automaton
+    keywords = sorted({keyword for outputs in automaton.output for keyword, _ in outputs})
+    print(f"{len(keywords)} keywords")
+    print(f"{'size':>8} {'loops':>10} {'automaton':>10} {'full scan':>10} {'hits':>8}")
+    for size in args.sizes:
+        text = synthetic_contract(parse_size(size))
+        repeat = args.repeat if len(text) <= 10 * 1024 * 1024 else 1
+        loops = best_of(repeat, substring_loops, text, keywords)
+        matched = best_of(repeat, automaton.find_all, text)
+        scan = best_of(repeat, main.analyzer.scan, text)
+        hits = len(automaton.find_all(text))
+        print(f"{size:>8} {loops:>9.4f}s {matched:>9.4f}s {scan:>9.4f}s {hits:>8}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,83 @@
+"""Question ranking throughput: BM25 over the sentence index against the old substring loop.
+
+The old loop split the document on '. ' for every question and counted how
+many question words occurred in each sentence as raw substrings. The default
+size gives about 100k sentences.
+
+    python ClauseWise/benchmarks/bench_questions.py --size 13MB
+"""
+import argparse
+import re
+import time
+
+from corpus import parse_size, synthetic_contract
+
+import main
+
+QUESTIONS = [
+    "What is the termination notice period?",
+    "Explain the governing law and arbitration",
+    "What about liability limits?",
+    "intellectual property force majeure",
+    "tell me about the employee salary",
+    "What is the wholesale goods penalty?",
+]
+
+
+def question_keywords(question: str):
+    return [word for word in re.findall(r'\b\w+\b', question.lower()) if len(word) > 3]
+
+
+def substring_loop(text: str, question: str):
+    relevant = []
+    keywords = question_keywords(question)
+    for sentence in text.split('. '):
+        sentence_lower = sentence.lower()
+        matches = sum(1 for keyword in keywords if keyword in sentence_lower)
+        if matches > 0:
+            relevant.append((sentence.strip(), matches))
+    relevant.sort(key=lambda item: item[1], reverse=True)
+    return relevant[:3]
+
+
+def questions_per_second(function, seconds: float) -> float:
+    answered = 0
+    started = time.perf_counter()
+    while True:
+        for question in QUESTIONS:
+            function(question)
+        answered += len(QUESTIONS)
+        elapsed = time.perf_counter() - started
+        if elapsed >= seconds:
+            return answered / elapsed
+
+
+def benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="13MB")
+    parser.add_argument("--seconds", type=float, default=3.0, help="minimum time spent on each method")
+    args = parser.parse_args()
+
+    text = synthetic_contract(parse_size(args.size))
+    started = time.perf_counter()
+    index = main.SentenceIndex(text)
+    print(f"{len(index)} sentences, {len(text) / 2**20:.1f} MiB, index build {time.perf_counter() - started:.2f}s")
+
+    numpy_module = main.np
+    main.np = None
+    python_index = main.SentenceIndex(text)
+    main.np = numpy_module
+
+    rows = [("substring loop", lambda question: substring_loop(text, question))]
+    if index.vectorized:
+        rows.append(("BM25, NumPy", lambda question: index.rank(question_keywords(question), 3)))
+    rows.append(("BM25, pure Python", lambda question: python_index.rank(question_keywords(question), 3)))
+    context = main.QuestionContext(text, index)
+    context.facts  # built at upload for stored documents
+    rows.append(("answer_question", lambda question: main.answer_question(question, text, context=context)))
+    for name, function in rows:
+        print(f"{name:<20} {questions_per_second(function, args.seconds):>10.1f} questions/s")
+
+
+if __name__ == "__main__":
+    benchmark()
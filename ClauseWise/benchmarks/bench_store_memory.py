@@ -0,0 +1,97 @@
+"""Memory held by stored documents: compact form against plain str documents.
+
+Puts --documents analyzed documents of about --chars characters into a
+MemoryDocumentStore, which holds compact text, array offset tables and packed
+paragraph findings, and the same documents as plain dicts of str and lists,
+which is how they were held before. Half the documents use typographic
+punctuation, which makes CPython store the whole str at two bytes per
+character. Memory is measured with tracemalloc.
+
+    python ClauseWise/benchmarks/bench_store_memory.py --documents 10000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from corpus import parse_size, synthetic_contract
+
+import main
+
+BASES = 20
+SNIPPET_CHARS = 400
+
+
+def analyzed_documents(chars: int):
+    """(text, analysis JSON) for BASES distinct documents; stored copies are decoded from the JSON"""
+    bases = []
+    for seed in range(BASES):
+        text = synthetic_contract(chars, seed)
+        if seed % 2:
+            text = text.replace(" the ", " the “Provider” ", 1).replace(". ", " — ", 3)
+        result = main.analyze_upload(text)
+        result["paragraphs"] = main.unpack_paragraphs(result["paragraphs"])
+        bases.append((text, json.dumps({key: result[key] for key in ("analysis", "facts", "paragraphs")})))
+    return bases
+
+
+def fill(put, bases, count: int) -> float:
+    """Put count documents and return the memory they hold in MiB"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        text, blob = bases[i % len(bases)]
+        stored = json.loads(blob)
+        put({
+            "id": f"doc{i}",
+            "filename": f"doc{i}.txt",
+            "text": text + f"\nReference {i}.",
+            "page_offsets": [0, 100, 200, 300, 400],
+            "analysis": stored["analysis"],
+            "facts": stored["facts"],
+            "paragraphs": stored["paragraphs"],
+            "upload_time": "2026-01-01T00:00:00"
+        })
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held / 2**20
+
+
+def snippet_microseconds(get, count: int) -> float:
+    started = time.perf_counter()
+    reads = 0
+    for i in range(0, count, 7):
+        get(f"doc{i}")["text"][1000:1000 + SNIPPET_CHARS]
+        reads += 1
+    return (time.perf_counter() - started) * 1e6 / reads
+
+
+def benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--chars", default="12KB")
+    args = parser.parse_args()
+
+    bases = analyzed_documents(parse_size(args.chars))
+    print(f"{args.documents} documents of about {parse_size(args.chars) / 1000:.0f}k characters")
+
+    plain = {}
+    plain_mib = fill(lambda document: plain.__setitem__(document["id"], document), bases, args.documents)
+    plain_accounted = sum(main.deep_sizeof(document) for document in plain.values()) / 2**20
+    plain_snippet = snippet_microseconds(plain.get, args.documents)
+    plain.clear()
+
+    store = main.MemoryDocumentStore()
+    compact_mib = fill(store.put, bases, args.documents)
+    compact_snippet = snippet_microseconds(store.get, args.documents)
+
+    print(f"{'':<8} {'traced':>10} {'accounted':>10} {'snippet':>10}")
+    print(f"{'plain':<8} {plain_mib:>7.0f} MiB {plain_accounted:>6.0f} MiB {plain_snippet:>7.1f} us")
+    print(f"{'compact':<8} {compact_mib:>7.0f} MiB {store.bytes_held / 2**20:>6.0f} MiB {compact_snippet:>7.1f} us")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,52 @@
+"""Synthetic contract text and module loading shared by the benchmarks"""
+import os
+import random
+import sys
+
+# Import main without touching the SQLite file the app uses by default
+os.environ.setdefault("DOCUMENT_STORE", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "the party shall provide services to the client under this agreement including payment terms "
+    "termination notice liability limited confidentiality clause governing law of India wholesale goods "
+    "employee salary tenant lease penalty arbitration dispute resolution intellectual property force majeure "
+    "indemnification"
+).split()
+HEADINGS = ("TERMINATION", "LIABILITY", "PAYMENT TERMS", "CONFIDENTIALITY", "GOVERNING LAW")
+
+
+def synthetic_contract(chars: int, seed: int = 1) -> str:
+    """Contract-like text of about chars characters: articles, numbered sections, parties, dates and amounts"""
+    rnd = random.Random(seed)
+    paragraphs, size, article = [], 0, 0
+    while size < chars:
+        if len(paragraphs) % 12 == 0:
+            article += 1
+            paragraph = f"ARTICLE {article}. {rnd.choice(HEADINGS)}"
+        else:
+            sentences = []
+            for _ in range(rnd.randint(2, 6)):
+                roll = rnd.random()
+                if roll < 0.1:
+                    sentences.append(f"ACME HOLDINGS LLC agrees to pay ${rnd.randint(1, 99)},{rnd.randint(100, 999)}.00 "
+                                     f"on {rnd.randint(1, 12)}/{rnd.randint(1, 28)}/2024.")
+                elif roll < 0.15:
+                    sentences.append(f"Effective January {rnd.randint(1, 28)}, 2024 the Provider shall give notice.")
+                elif roll < 0.2:
+                    sentences.append(f"Section {rnd.randint(1, 40)}.{rnd.randint(1, 9)} Termination for convenience requires notice.")
+                else:
+                    sentences.append(" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(8, 20))).capitalize() + ".")
+            paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:chars]
+
+
+def parse_size(value: str) -> int:
+    """'1KB', '10MB' or a plain number of characters"""
+    units = {"KB": 1024, "MB": 1024 * 1024}
+    for unit, factor in units.items():
+        if value.upper().endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
@@ -1,18 +1,54 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import PyPDF2
-from docx import Document
 import tempfile
 import os
 import uuid
 import io
-from typing import Dict, List, Optional
-from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, OrderedDict, deque
+from collections.abc import Sequence
+from abc import ABC, abstractmethod
+import asyncio
+import base64
+import codecs
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from functools import partial
+import hashlib
+import heapq
+import mmap
+import signal
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from xml.etree import ElementTree
+import sys
 import json
 import logging
+import math
 import re
 from dotenv import load_dotenv
+from multipart.multipart import MultipartParser, parse_options_header
+
+try:
+    import numpy as np
+except ImportError:  # BM25 scoring falls back to pure Python
+    np = None
+
+try:
+    import re2
+except ImportError:  # only needed for REGEX_BACKEND=re2
+    re2 = None
 
 # Load environment variables
 load_dotenv()
@@ -38,18 +74,1272 @@ class QuestionRequest(BaseModel):
     question: str
     document_id: str
 
+class QuestionsRequest(BaseModel):
+    questions: List[str]
+    document_id: str
+
 class DocumentResponse(BaseModel):
     document_id: str
     filename: str
     summary: dict
+    cache_hit: bool = False
+    reuse: Optional[dict] = None  # work carried over from previous_document_id
 
 class QuestionResponse(BaseModel):
     answer: str
     relevant_sections: List[str]
     confidence_score: float
 
-# In-memory storage for documents
-documents_store: Dict[str, Dict] = {}
+class TimedAnswer(QuestionResponse):
+    question: str
+    elapsed_ms: float
+
+class QuestionsResponse(BaseModel):
+    document_id: str
+    answers: List[TimedAnswer]
+    elapsed_ms: float
+
+# Compact stored documents: text as one UTF-8 buffer, offsets in arrays, slices decoded on demand
+TEXT_CHECKPOINT_CHARS = 64
+
+class CompactText:
+    """Document text held as UTF-8 bytes instead of a str.
+
+    A str with a single character outside Latin-1 (a curly quote, a dash) takes
+    two or four bytes per character; legal text is mostly ASCII, so its UTF-8
+    form is close to one. Slicing decodes only the requested range through a
+    memoryview. For non-ASCII text, checkpoints holds the byte offset of every
+    TEXT_CHECKPOINT_CHARS-th character so a character offset maps to a byte
+    offset after decoding at most one short run.
+    """
+
+    __slots__ = ("data", "length", "checkpoints")
+
+    def __init__(self, text: str):
+        if text.isascii():
+            self.data, self.length, self.checkpoints = text.encode("ascii"), len(text), None
+            return
+        pieces = [text[start:start + TEXT_CHECKPOINT_CHARS].encode("utf-8") for start in range(0, len(text), TEXT_CHECKPOINT_CHARS)]
+        checkpoints = array('I', [0])
+        for piece in pieces:
+            checkpoints.append(checkpoints[-1] + len(piece))
+        self.data, self.length, self.checkpoints = b"".join(pieces), len(text), checkpoints
+
+    @classmethod
+    def from_utf8(cls, data: bytes) -> "CompactText":
+        if not data.isascii():
+            return cls(data.decode("utf-8"))
+        compact = cls.__new__(cls)
+        compact.data, compact.length, compact.checkpoints = data, len(data), None
+        return compact
+
+    def byte_offset(self, offset: int) -> int:
+        if self.checkpoints is None:
+            return offset
+        run, skip = divmod(offset, TEXT_CHECKPOINT_CHARS)
+        start = self.checkpoints[run]
+        if not skip:
+            return start
+        return start + len(self.data[start:self.checkpoints[run + 1]].decode("utf-8")[:skip].encode("utf-8"))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            if step != 1:
+                return str(self)[key]
+            if stop <= start:
+                return ""
+            return str(memoryview(self.data)[self.byte_offset(start):self.byte_offset(stop)], "utf-8")
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("text index out of range")
+        return self[key:key + 1]
+
+    def __str__(self) -> str:
+        return self.data.decode("utf-8")
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.data) + (sys.getsizeof(self.checkpoints) if self.checkpoints is not None else 0)
+
+def utf8_bytes(text: Union[str, CompactText]) -> bytes:
+    return text.data if isinstance(text, CompactText) else text.encode("utf-8")
+
+def pack_paragraphs(records: List[list], level: int = 6) -> bytes:
+    """Paragraph findings as compressed JSON; they are only read back when a new version is uploaded"""
+    return zlib.compress(json.dumps(records).encode("utf-8"), level)
+
+def unpack_paragraphs(blob: bytes) -> List[list]:
+    return json.loads(zlib.decompress(blob))
+
+def compact_document(document: Dict) -> Dict:
+    """The form a stored document is held in: compact text, array offset tables and packed paragraphs"""
+    compact = dict(document)
+    text = document["text"]
+    compact["text"] = text if isinstance(text, CompactText) else CompactText(text)
+    compact["page_offsets"] = array('I', document["page_offsets"])
+    facts = document.get("facts")
+    if facts is not None and "clause_tree" in facts:
+        compact["facts"] = {
+            **facts,
+            "clause_tree": ClauseTable(facts["clause_tree"]),
+            "clause_terms": {term: array('I', ids) for term, ids in facts["clause_terms"].items()}
+        }
+    paragraphs = document.get("paragraphs")
+    if paragraphs is not None and not isinstance(paragraphs, bytes):
+        compact["paragraphs"] = pack_paragraphs(paragraphs)
+    return compact
+
+# Document storage; the backend is chosen with DOCUMENT_STORE so several workers can share documents
+JOB_FINISHED = ("completed", "failed")
+DELETION_LOG_SECONDS = int(os.getenv("DELETION_LOG_SECONDS", 24 * 3600))
+
+class DocumentStore(ABC):
+    """Storage backend for uploaded documents: put, get, page and delete"""
+
+    @abstractmethod
+    def put(self, document: Dict):
+        ...
+
+    @abstractmethod
+    def get(self, document_id: str) -> Optional[Dict]:
+        """Return the full document (text, page offsets and analysis), or None"""
+
+    @abstractmethod
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None, document_type: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None, filename_prefix: Optional[str] = None,
+             descending: bool = False) -> List[Dict]:
+        """Up to limit document summaries in (upload_time, id) order, starting after the given key.
+
+        since is inclusive and until exclusive; both compare against the ISO upload_time.
+        With descending the order is newest first and the page starts below the given key.
+        """
+
+    @abstractmethod
+    def delete(self, document_id: str) -> bool:
+        """Remove a document; returns False if it did not exist"""
+
+    @abstractmethod
+    def ids(self) -> List[str]:
+        ...
+
+    def get_paragraphs(self, document_id: str) -> Optional[List[list]]:
+        """Return the paragraph findings recorded for a document, or None"""
+        document = self.get(document_id)
+        paragraphs = document.get("paragraphs") if document is not None else None
+        return unpack_paragraphs(paragraphs) if isinstance(paragraphs, bytes) else paragraphs
+
+    @abstractmethod
+    def put_facts(self, document_id: str, facts: Dict):
+        """Record a fact sheet built after upload for a document stored without one"""
+
+    def __contains__(self, document_id: str) -> bool:
+        return self.get(document_id) is not None
+
+    def deleted_since(self, since: str) -> List[Tuple[str, str]]:
+        """(deleted_at, document_id) for deletions at or after the ISO time since, oldest first.
+
+        Only stores shared between workers need to record deletions; the others return nothing.
+        """
+        return []
+
+    @abstractmethod
+    def put_job(self, job: Dict):
+        """Record the current state of a background upload job"""
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    def expire_jobs(self, before: str):
+        """Drop finished jobs last updated before the given ISO time"""
+
+    def close(self):
+        pass
+
+    @abstractmethod
+    def stats(self) -> Dict:
+        """Entry count, bytes held and lookup counters"""
+
+    @staticmethod
+    def summary(document: Dict) -> Dict:
+        return {
+            "document_id": document["id"],
+            "filename": document["filename"],
+            "document_type": document["analysis"]["document_type"],
+            "upload_time": document["upload_time"]
+        }
+
+def deep_sizeof(obj) -> int:
+    """Approximate memory held by a JSON-like value, including nested containers"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k) + deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item) for item in obj)
+    return size
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """The least string above every string starting with prefix, or None if there is none"""
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code == 0xD800:
+            code = 0xE000  # surrogates cannot be encoded, so the next code point is past them
+        if code <= sys.maxunicode:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
+
+class DocumentListing:
+    """Secondary indexes over document summaries, kept sorted by (upload_time, id).
+
+    One list covers every document and one more each document type, so a page
+    is a bisect to its first key followed by a walk of at most limit entries
+    (plus any that a filename prefix filters out). A list sorted by filename
+    serves prefixes that match too few documents for the walk to find quickly.
+    """
+
+    def __init__(self):
+        self.summaries: Dict[str, Dict] = {}
+        self.order: List[Tuple[str, str]] = []
+        self.by_type: Dict[str, List[Tuple[str, str]]] = {}
+        self.by_filename: List[Tuple[str, str, str]] = []
+
+    @staticmethod
+    def key(summary: Dict) -> Tuple[str, str]:
+        return summary["upload_time"], summary["document_id"]
+
+    def add(self, summary: Dict):
+        self.remove(summary["document_id"])
+        key = self.key(summary)
+        self.summaries[summary["document_id"]] = summary
+        # Uploads arrive in time order, so insort nearly always appends
+        insort(self.order, key)
+        insort(self.by_type.setdefault(summary["document_type"], []), key)
+        insort(self.by_filename, (summary["filename"], *key))
+
+    def remove(self, document_id: str):
+        summary = self.summaries.pop(document_id, None)
+        if summary is None:
+            return
+        key = self.key(summary)
+        del self.order[bisect_left(self.order, key)]
+        keys = self.by_type[summary["document_type"]]
+        del keys[bisect_left(keys, key)]
+        if not keys:
+            del self.by_type[summary["document_type"]]
+        del self.by_filename[bisect_left(self.by_filename, (summary["filename"], *key))]
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None, document_type: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None, filename_prefix: Optional[str] = None,
+             descending: bool = False) -> List[Dict]:
+        keys = self.order if document_type is None else self.by_type.get(document_type, [])
+        if filename_prefix:
+            start = bisect_left(self.by_filename, (filename_prefix,))
+            upper = prefix_upper_bound(filename_prefix)
+            end = bisect_left(self.by_filename, (upper,)) if upper is not None else len(self.by_filename)
+            # A walk in time order visits about limit * len(keys) / matches entries; the prefix range visits matches
+            if (end - start) ** 2 <= limit * len(keys):
+                return self._page_by_prefix(start, end, limit, after, document_type, since, until, descending)
+        if descending:
+            return self._page_descending(keys, limit, after, since, until, filename_prefix)
+        position = bisect_left(keys, (since,)) if since is not None else 0
+        if after is not None:
+            position = max(position, bisect_right(keys, tuple(after)))
+        page = []
+        while position < len(keys) and len(page) < limit:
+            upload_time, document_id = keys[position]
+            position += 1
+            if until is not None and upload_time >= until:
+                break
+            summary = self.summaries[document_id]
+            if filename_prefix and not summary["filename"].startswith(filename_prefix):
+                continue
+            page.append(summary)
+        return page
+
+    def _page_descending(self, keys: List[Tuple[str, str]], limit: int, after: Optional[Tuple[str, str]],
+                         since: Optional[str], until: Optional[str], filename_prefix: Optional[str]) -> List[Dict]:
+        # position is one past the newest key on the page
+        position = bisect_left(keys, (until,)) if until is not None else len(keys)
+        if after is not None:
+            position = min(position, bisect_left(keys, tuple(after)))
+        page = []
+        while position > 0 and len(page) < limit:
+            position -= 1
+            upload_time, document_id = keys[position]
+            if since is not None and upload_time < since:
+                break
+            summary = self.summaries[document_id]
+            if filename_prefix and not summary["filename"].startswith(filename_prefix):
+                continue
+            page.append(summary)
+        return page
+
+    def _page_by_prefix(self, start: int, end: int, limit: int, after: Optional[Tuple[str, str]],
+                        document_type: Optional[str], since: Optional[str], until: Optional[str],
+                        descending: bool) -> List[Dict]:
+        # by_filename[start:end] holds the documents whose filename has the prefix, in filename order
+        after = tuple(after) if after is not None else None
+        keys = []
+        for _, upload_time, document_id in self.by_filename[start:end]:
+            key = (upload_time, document_id)
+            if document_type is not None and self.summaries[document_id]["document_type"] != document_type:
+                continue
+            if (since is not None and upload_time < since) or (until is not None and upload_time >= until):
+                continue
+            if after is not None and (key >= after if descending else key <= after):
+                continue
+            keys.append(key)
+        keys = heapq.nlargest(limit, keys) if descending else heapq.nsmallest(limit, keys)
+        return [self.summaries[document_id] for _, document_id in keys]
+
+class MemoryDocumentStore(DocumentStore):
+    """Process-local store with a memory budget; documents are not shared between workers.
+
+    Entries are kept in LRU order and evicted when the byte or entry budget is
+    exceeded or when they have not been read for ttl seconds. Evicted documents
+    are written to the spill store if one is configured, and read back from it.
+    Public methods hold self.lock, since requests read the store from worker
+    threads while uploads and deletes change it.
+    """
+
+    def __init__(self, max_bytes: int = 0, max_entries: int = 0, ttl: float = 0,
+                 spill: Optional[DocumentStore] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.spill = spill
+        self.lock = threading.Lock()
+        # document_id -> (document, size, last access)
+        self.documents: "OrderedDict[str, tuple]" = OrderedDict()
+        self.listing = DocumentListing()
+        self.jobs: Dict[str, Dict] = {}
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.spill_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _over_budget(self) -> bool:
+        return ((self.max_bytes > 0 and self.bytes_held > self.max_bytes)
+                or (self.max_entries > 0 and len(self.documents) > self.max_entries))
+
+    def _evict(self, document_id: str):
+        document, size, _ = self.documents.pop(document_id)
+        self.bytes_held -= size
+        self.listing.remove(document_id)
+        if self.spill is not None:
+            self.spill.put(document)
+
+    def _expire(self):
+        if self.ttl <= 0:
+            return
+        cutoff = time.monotonic() - self.ttl
+        while self.documents:
+            document_id, (_, _, accessed) = next(iter(self.documents.items()))
+            if accessed > cutoff:
+                break
+            self._evict(document_id)
+            self.expirations += 1
+
+    def put(self, document: Dict):
+        document = compact_document(document)
+        with self.lock:
+            self._expire()
+            document_id = document["id"]
+            if document_id in self.documents:
+                self.bytes_held -= self.documents.pop(document_id)[1]
+            size = deep_sizeof(document)
+            self.documents[document_id] = (document, size, time.monotonic())
+            self.bytes_held += size
+            self.listing.add(self.summary(document))
+            while self._over_budget():
+                # A single document larger than the budget is still kept until the next put
+                oldest = next(iter(self.documents))
+                if oldest == document_id:
+                    break
+                self._evict(oldest)
+                self.evictions += 1
+
+    def get(self, document_id: str) -> Optional[Dict]:
+        with self.lock:
+            self._expire()
+            entry = self.documents.get(document_id)
+            if entry is not None:
+                self.hits += 1
+                self.documents[document_id] = (entry[0], entry[1], time.monotonic())
+                self.documents.move_to_end(document_id)
+                return entry[0]
+            document = self.spill.get(document_id) if self.spill is not None else None
+            if document is None:
+                self.misses += 1
+                return None
+            self.spill_hits += 1
+            return document
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None, document_type: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None, filename_prefix: Optional[str] = None,
+             descending: bool = False) -> List[Dict]:
+        with self.lock:
+            self._expire()
+            filters = dict(after=after, document_type=document_type, since=since, until=until, filename_prefix=filename_prefix,
+                           descending=descending)
+            page = self.listing.page(limit, **filters)
+            if self.spill is None:
+                return page
+            # Both sources are in key order, so the first limit of their merge is this page
+            spilled = [doc for doc in self.spill.page(limit, **filters) if doc["document_id"] not in self.documents]
+            return list(heapq.merge(page, spilled, key=DocumentListing.key, reverse=descending))[:limit]
+
+    def ids(self) -> List[str]:
+        with self.lock:
+            self._expire()
+            ids = list(self.documents)
+            if self.spill is not None:
+                ids.extend(document_id for document_id in self.spill.ids() if document_id not in self.documents)
+            return ids
+
+    def delete(self, document_id: str) -> bool:
+        with self.lock:
+            entry = self.documents.pop(document_id, None)
+            if entry is not None:
+                self.bytes_held -= entry[1]
+                self.listing.remove(document_id)
+            spilled = self.spill.delete(document_id) if self.spill is not None else False
+            return entry is not None or spilled
+
+    def get_paragraphs(self, document_id: str) -> Optional[List[list]]:
+        with self.lock:
+            entry = self.documents.get(document_id)
+            if entry is not None:
+                paragraphs = entry[0].get("paragraphs")
+                return unpack_paragraphs(paragraphs) if paragraphs is not None else None
+            return self.spill.get_paragraphs(document_id) if self.spill is not None else None
+
+    def put_facts(self, document_id: str, facts: Dict):
+        with self.lock:
+            entry = self.documents.get(document_id)
+            if entry is not None:
+                # Replaced in place, so the LRU position and last access are unchanged
+                document = compact_document({**entry[0], "facts": facts})
+                size = deep_sizeof(document)
+                self.documents[document_id] = (document, size, entry[2])
+                self.bytes_held += size - entry[1]
+            elif self.spill is not None:
+                self.spill.put_facts(document_id, facts)
+
+    def __contains__(self, document_id: str) -> bool:
+        with self.lock:
+            return document_id in self.documents or (self.spill is not None and document_id in self.spill)
+
+    def put_job(self, job: Dict):
+        with self.lock:
+            self.jobs[job["job_id"]] = dict(job)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def expire_jobs(self, before: str):
+        with self.lock:
+            for job_id in [job_id for job_id, job in self.jobs.items() if job["status"] in JOB_FINISHED and job["updated_at"] < before]:
+                del self.jobs[job_id]
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            self._expire()
+            lookups = self.hits + self.spill_hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self.documents),
+                "bytes": self.bytes_held,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "spill_hits": self.spill_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "spill": self.spill.stats() if self.spill is not None else None
+            }
+
+class SQLiteDocumentStore(DocumentStore):
+    """SQLite store in WAL mode, safe to share between uvicorn workers on one host.
+
+    Metadata, compressed text and analysis live in separate tables so listing
+    documents never reads the text blobs.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            document_type TEXT,
+            upload_time TEXT NOT NULL
+        );
+        DROP INDEX IF EXISTS documents_upload_time;
+        CREATE INDEX IF NOT EXISTS documents_listing ON documents (upload_time, id);
+        CREATE INDEX IF NOT EXISTS documents_type_listing ON documents (document_type, upload_time, id);
+        CREATE INDEX IF NOT EXISTS documents_filename ON documents (filename);
+        CREATE TABLE IF NOT EXISTS document_texts (
+            id TEXT PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+            text BLOB NOT NULL,
+            page_offsets TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS document_analyses (
+            id TEXT PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+            analysis TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS document_facts (
+            id TEXT PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+            facts TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS document_paragraphs (
+            id TEXT PRIMARY KEY REFERENCES documents (id) ON DELETE CASCADE,
+            paragraphs BLOB NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS document_deletions (
+            id TEXT NOT NULL,
+            deleted_at TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS document_deletions_deleted_at ON document_deletions (deleted_at);
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            job TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at);
+    """
+
+    def __init__(self, path: str, compression_level: int = 6):
+        self.path = path
+        self.compression_level = compression_level
+        self.local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.connection().executescript(self.SCHEMA)
+
+    def connection(self) -> sqlite3.Connection:
+        """One connection per thread; executor and event loop threads each get their own"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self.local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def put(self, document: Dict):
+        text = zlib.compress(utf8_bytes(document["text"]), self.compression_level)
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (id, filename, document_type, upload_time) VALUES (?, ?, ?, ?)",
+                (document["id"], document["filename"], document["analysis"]["document_type"], document["upload_time"])
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO document_texts (id, text, page_offsets) VALUES (?, ?, ?)",
+                (document["id"], text, json.dumps(list(document["page_offsets"])))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO document_analyses (id, analysis) VALUES (?, ?)",
+                (document["id"], json.dumps(document["analysis"]))
+            )
+            if document.get("facts") is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO document_facts (id, facts) VALUES (?, ?)",
+                    (document["id"], json.dumps(document["facts"], default=list))
+                )
+            paragraphs = document.get("paragraphs")
+            if paragraphs is not None:
+                if not isinstance(paragraphs, bytes):
+                    paragraphs = pack_paragraphs(paragraphs, self.compression_level)
+                conn.execute(
+                    "INSERT OR REPLACE INTO document_paragraphs (id, paragraphs) VALUES (?, ?)",
+                    (document["id"], paragraphs)
+                )
+
+    def get(self, document_id: str) -> Optional[Dict]:
+        row = self.connection().execute(
+            "SELECT d.filename, d.upload_time, t.text, t.page_offsets, a.analysis, f.facts FROM documents d "
+            "JOIN document_texts t ON t.id = d.id JOIN document_analyses a ON a.id = d.id "
+            "LEFT JOIN document_facts f ON f.id = d.id WHERE d.id = ?",
+            (document_id,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        filename, upload_time, text, page_offsets, analysis, facts = row
+        return compact_document({
+            "id": document_id,
+            "filename": filename,
+            "text": CompactText.from_utf8(zlib.decompress(text)),
+            "page_offsets": json.loads(page_offsets),
+            "analysis": json.loads(analysis),
+            "facts": json.loads(facts) if facts is not None else None,
+            "upload_time": upload_time
+        })
+
+    def page(self, limit: int, after: Optional[Tuple[str, str]] = None, document_type: Optional[str] = None,
+             since: Optional[str] = None, until: Optional[str] = None, filename_prefix: Optional[str] = None,
+             descending: bool = False) -> List[Dict]:
+        # Served in key order from documents_listing, or documents_type_listing with a document_type;
+        # a filename prefix is a range on documents_filename instead, with the matches sorted
+        conditions, parameters = [], []
+        if document_type is not None:
+            conditions.append("document_type = ?")
+            parameters.append(document_type)
+        if after is not None:
+            conditions.append(f"(upload_time, id) {'<' if descending else '>'} (?, ?)")
+            parameters.extend(after)
+        if since is not None:
+            conditions.append("upload_time >= ?")
+            parameters.append(since)
+        if until is not None:
+            conditions.append("upload_time < ?")
+            parameters.append(until)
+        if filename_prefix:
+            conditions.append("filename >= ?")
+            parameters.append(filename_prefix)
+            upper = prefix_upper_bound(filename_prefix)
+            if upper is not None:
+                conditions.append("filename < ?")
+                parameters.append(upper)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        order = "upload_time DESC, id DESC" if descending else "upload_time, id"
+        rows = self.connection().execute(
+            f"SELECT id, filename, document_type, upload_time FROM documents {where}ORDER BY {order} LIMIT ?",
+            (*parameters, limit)
+        ).fetchall()
+        return [
+            {"document_id": doc_id, "filename": filename, "document_type": document_type, "upload_time": upload_time}
+            for doc_id, filename, document_type, upload_time in rows
+        ]
+
+    def ids(self) -> List[str]:
+        return [row[0] for row in self.connection().execute("SELECT id FROM documents")]
+
+    def get_paragraphs(self, document_id: str) -> Optional[List[list]]:
+        # Kept out of get(): only uploads of a new version read them
+        row = self.connection().execute(
+            "SELECT paragraphs FROM document_paragraphs WHERE id = ?", (document_id,)
+        ).fetchone()
+        return unpack_paragraphs(row[0]) if row is not None else None
+
+    def put_facts(self, document_id: str, facts: Dict):
+        # A document deleted meanwhile by another worker is left deleted
+        self.connection().execute(
+            "INSERT OR REPLACE INTO document_facts (id, facts) SELECT ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE id = ?)",
+            (document_id, json.dumps(facts, default=list), document_id)
+        )
+
+    def delete(self, document_id: str) -> bool:
+        now = datetime.now()
+        with self.transaction() as conn:
+            if conn.execute("DELETE FROM documents WHERE id = ?", (document_id,)).rowcount == 0:
+                return False
+            # Other workers drop the document from their search index when they next sync
+            conn.execute("INSERT INTO document_deletions (id, deleted_at) VALUES (?, ?)", (document_id, now.isoformat()))
+            conn.execute(
+                "DELETE FROM document_deletions WHERE deleted_at < ?",
+                ((now - timedelta(seconds=DELETION_LOG_SECONDS)).isoformat(),)
+            )
+            return True
+
+    def deleted_since(self, since: str) -> List[Tuple[str, str]]:
+        return self.connection().execute(
+            "SELECT deleted_at, id FROM document_deletions WHERE deleted_at >= ? ORDER BY deleted_at", (since,)
+        ).fetchall()
+
+    def __contains__(self, document_id: str) -> bool:
+        return self.connection().execute("SELECT 1 FROM documents WHERE id = ?", (document_id,)).fetchone() is not None
+
+    def put_job(self, job: Dict):
+        self.connection().execute(
+            "INSERT OR REPLACE INTO jobs (id, status, updated_at, job) VALUES (?, ?, ?, ?)",
+            (job["job_id"], job["status"], job["updated_at"], json.dumps(job))
+        )
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        row = self.connection().execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def expire_jobs(self, before: str):
+        statuses = ", ".join("?" * len(JOB_FINISHED))
+        self.connection().execute(
+            f"DELETE FROM jobs WHERE updated_at < ? AND status IN ({statuses})", (before, *JOB_FINISHED)
+        )
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def stats(self) -> Dict:
+        entries, text_bytes = self.connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM document_texts"
+        ).fetchone()
+        analysis_bytes = self.connection().execute(
+            "SELECT COALESCE(SUM(LENGTH(analysis)), 0) FROM document_analyses"
+        ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": text_bytes + analysis_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": 0,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+def create_document_store(backend: str) -> DocumentStore:
+    if backend == "memory":
+        spill_path = os.getenv("DOCUMENT_STORE_SPILL_PATH")
+        return MemoryDocumentStore(
+            max_bytes=int(os.getenv("DOCUMENT_STORE_MAX_BYTES", 512 * 1024 * 1024)),
+            max_entries=int(os.getenv("DOCUMENT_STORE_MAX_ENTRIES", 0)),
+            ttl=float(os.getenv("DOCUMENT_STORE_TTL_SECONDS", 0)),
+            spill=SQLiteDocumentStore(spill_path) if spill_path else None
+        )
+    if backend == "sqlite":
+        return SQLiteDocumentStore(os.getenv("DOCUMENT_STORE_PATH", "clausewise.db"))
+    raise ValueError(f"Unknown DOCUMENT_STORE backend: {backend}")
+
+documents_store = create_document_store(os.getenv("DOCUMENT_STORE", "sqlite"))
+
+# Content-addressed cache of extracted text and analysis, so re-uploads of the same file skip both
+class AnalysisCache:
+    """LRU cache keyed by a hash of the uploaded bytes, bounded by entry count and bytes.
+
+    Results are put from a worker thread (sizing one serializes it), so access is locked.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.bytes_held = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(content_hash: str, extension: str) -> str:
+        """Cache key for an upload; the extension is part of it since it picks the parser"""
+        return f"{extension}:{content_hash}"
+
+    @staticmethod
+    def entry_size(result: Dict) -> int:
+        paragraphs = result.get("paragraphs") or b""
+        rest = {k: v for k, v in result.items() if k not in ("text", "paragraphs")}
+        return sys.getsizeof(result["text"]) + len(paragraphs) + len(json.dumps(rest))
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the processing result (text, analysis, ...) for a previously seen upload, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, result: Dict):
+        """Store an upload's processing result, evicting least recently used entries"""
+        size = self.entry_size(result)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.bytes_held -= self.entries.pop(key)[1]
+            self.entries[key] = (result, size)
+            self.bytes_held += size
+            while len(self.entries) > self.max_entries or self.bytes_held > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes_held -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes_held,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 256)),
+    max_bytes=int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+)
+
+# Whole-document patterns run on Python's re by default, written with possessive quantifiers so
+# no repetition is re-scanned on failure; REGEX_BACKEND=re2 compiles them for RE2 instead, which
+# matches in linear time regardless of pattern (its \b, \s and \d are ASCII-only)
+REGEX_BACKEND = os.getenv("REGEX_BACKEND", "re")
+if REGEX_BACKEND == "re2" and re2 is None:
+    logger.warning("REGEX_BACKEND=re2 but google-re2 is not installed; using re")
+    REGEX_BACKEND = "re"
+
+RE2_SYNTAX = (('++', '+'), ('*+', '*'), ('?+', '?'), ('(?>', '(?:'), (r'[^\W_]', r'[\p{L}\p{N}]'))
+
+def compile_document_pattern(pattern: str):
+    """Compile a pattern that is run over whole documents with the configured backend"""
+    if REGEX_BACKEND == "re2":
+        for construct, replacement in RE2_SYNTAX:
+            pattern = pattern.replace(construct, replacement)
+        return re2.compile(pattern)
+    return re.compile(pattern)
+
+# Case folding that keeps offsets into the folded text valid for the original text
+def fold_case(text: str) -> str:
+    """Lower-case text without changing its length"""
+    folded = text.lower()
+    if len(folded) != len(text):
+        # A few characters (e.g. 'İ') lower-case to two code points; leave those alone
+        folded = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+    return folded
+
+# Documents are scanned in windows of this many characters, each overlapping the previous one
+SCAN_WINDOW_CHARS = int(os.getenv("SCAN_WINDOW_CHARS", 1024 * 1024))
+SCAN_OVERLAP_CHARS = int(os.getenv("SCAN_OVERLAP_CHARS", 4096))
+
+def text_windows(text: str, size: int) -> Iterator[str]:
+    """Consecutive slices of text, so a scan never copies more than one window at a time"""
+    for start in range(0, max(len(text), 1), size):
+        yield text[start:start + size]
+
+@dataclass
+class DocumentFeatures:
+    """Everything the analyzer reads from a document, collected in one scan"""
+    parties: List[str] = field(default_factory=list)
+    dates: List[str] = field(default_factory=list)
+    amounts: List[str] = field(default_factory=list)
+    section_headers: List[str] = field(default_factory=list)
+    keyword_offsets: Dict[str, List[int]] = field(default_factory=dict)  # first offsets of each keyword
+    legal_issues: List[str] = field(default_factory=list)
+    word_count: int = 0
+
+    def has(self, keyword: str) -> bool:
+        """Whether the keyword occurs anywhere in the document"""
+        return keyword in self.keyword_offsets
+
+    def count_present(self, keywords: List[str]) -> int:
+        """Number of the given keywords that occur in the document"""
+        return sum(1 for keyword in keywords if keyword in self.keyword_offsets)
+
+@dataclass
+class ScanFindings:
+    """What one scan of a piece of text found, before the findings of several pieces are merged"""
+    headers: List[str] = field(default_factory=list)
+    dates: List[str] = field(default_factory=list)
+    amounts: List[str] = field(default_factory=list)
+    parties: List[str] = field(default_factory=list)  # distinct raw matches, in order
+    parties_complete: bool = True  # False if the scan stopped at its party limit
+    keyword_offsets: Dict[str, List[int]] = field(default_factory=dict)  # relative to the piece
+    issues: List[int] = field(default_factory=list)  # legal issue rules seen as "anchor ... follower" on a line
+    word_count: int = 0
+
+class KeywordAutomaton:
+    """Case-insensitive Aho-Corasick automaton over word tokens.
+
+    Keywords are split into words and the automaton advances one word at a
+    time, so keywords only match on word boundaries ('sale' does not fire
+    inside 'wholesale'). The words of a multi-word keyword may be separated by
+    any run of whitespace, or by a hyphen where the keyword has one. Every hit,
+    overlapping ones included, is reported in one O(n) pass.
+    """
+
+    SEPARATOR = re.compile(r'(\s+|-)')
+    TOKEN = re.compile(r'[^\W_]+')
+
+    def __init__(self, keywords: List[str]):
+        # Edges out of the root are keyed by the bare word, deeper edges by separator + word
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[tuple] = [()]
+        self.max_words = 1
+
+        for keyword in keywords:
+            parts = self.SEPARATOR.split(keyword.lower())
+            words = parts[0::2]
+            separators = ['-' if sep == '-' else ' ' for sep in parts[1::2]]
+            state = 0
+            for key in [words[0]] + [sep + word for sep, word in zip(separators, words[1:])]:
+                next_state = self.goto[state].get(key)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                    self.goto[state][key] = next_state
+                state = next_state
+            self.output[state] += ((keyword, len(words)),)
+            self.max_words = max(self.max_words, len(words))
+
+        # Breadth-first failure links; each state also reports its suffix keywords
+        queue = deque(self.goto[0].values())
+        while queue:
+            parent = queue.popleft()
+            for key, child in self.goto[parent].items():
+                queue.append(child)
+                self.fail[child] = self._follow(self.fail[parent], key[0], key[1:])
+                self.output[child] += self.output[self.fail[child]]
+
+    def _follow(self, state: int, separator: str, word: str) -> int:
+        while state:
+            next_state = self.goto[state].get(separator + word)
+            if next_state is not None:
+                return next_state
+            state = self.fail[state]
+        return self.goto[0].get(word, 0)
+
+    def step(self, state: int, gap: str, word: str) -> int:
+        """Advance by one (lower-case) word token preceded by gap"""
+        if not state:
+            return self.goto[0].get(word, 0)
+        if gap == ' ' or gap.isspace():
+            return self._follow(state, ' ', word)
+        if gap == '-':
+            return self._follow(state, '-', word)
+        # Punctuation or other text between the words breaks any multi-word keyword
+        return self.goto[0].get(word, 0)
+
+    def find_all(self, text: str) -> List[tuple]:
+        """Return (keyword, offset) for every keyword occurrence in text"""
+        folded = fold_case(text)
+        cursor = KeywordCursor(self)
+        for match in self.TOKEN.finditer(folded):
+            cursor.feed(folded, match.start(), match.end())
+        return cursor.hits
+
+class KeywordCursor:
+    """Running automaton state while the words of one document are fed in order"""
+
+    def __init__(self, automaton: KeywordAutomaton):
+        self.automaton = automaton
+        self.state = 0
+        self.last_end = 0
+        self.starts = deque(maxlen=automaton.max_words)
+        self.hits: List[tuple] = []
+
+    def feed(self, folded: str, start: int, end: int, base: int = 0):
+        """Feed the word folded[start:end], where folded begins at document offset base"""
+        gap = ''
+        if self.state:
+            # A gap that is no longer in the window is too long to join a multi-word keyword
+            gap = folded[self.last_end - base:start] if self.last_end >= base else '.'
+        state = self.automaton.step(self.state, gap, folded[start:end])
+        self.state = state
+        self.last_end = base + end
+        self.starts.append(base + start)
+        if state:
+            for keyword, word_count in self.automaton.output[state]:
+                self.hits.append((keyword, self.starts[-word_count]))
+
+class FeatureScanner:
+    """Single-pass feature extraction over a document.
+
+    All patterns are compiled into one master expression when the scanner is
+    built. A scan lower-cases the text a window at a time and walks it with that
+    expression, collecting section headers, dates and amounts, and feeding every
+    other word to a keyword automaton that records each keyword hit with its
+    offset. Party names depend on capitalisation, so they are picked up by a
+    second expression over the original text of the same window.
+    """
+
+    ISSUE_PATTERN = re.compile(r'^(\w+)(?:\.\*(?:\(\?:([\w|]+)\)|(\w+)))?$')
+    # Offsets kept per keyword; the analysis only asks whether a keyword occurs
+    MAX_KEYWORD_OFFSETS = 64
+
+    def __init__(self, keywords: List[str], issue_patterns: List[str], date_patterns: List[str],
+                 section_patterns: List[str], party_pattern: str, money_pattern: str):
+        # Legal issue patterns all have the shape "anchor" or "anchor.*(?:follower|...)"
+        self.issue_rules = []
+        for pattern in issue_patterns:
+            match = self.ISSUE_PATTERN.match(pattern)
+            if not match:
+                raise ValueError(f"Unsupported legal issue pattern: {pattern}")
+            anchor, alternatives, single = match.groups()
+            followers = tuple((alternatives or single).split("|")) if (alternatives or single) else ()
+            label = pattern.replace('.*', ' ').replace(r'\b', '').strip()
+            self.issue_rules.append((f"Contains {label} provisions", anchor, followers))
+
+        literals = dict.fromkeys(keywords)
+        for _, anchor, followers in self.issue_rules:
+            literals[anchor] = None
+            literals.update(dict.fromkeys(followers))
+        self.automaton = KeywordAutomaton(list(literals))
+
+        numbered_section, *named_sections = section_patterns
+        self.master = compile_document_pattern(
+            rf"(?P<section>{numbered_section})"
+            rf"|(?P<heading>{'|'.join(named_sections)})"
+            rf"|(?P<date>(?i:{'|'.join(date_patterns)}))"
+            rf"|(?P<money>{money_pattern})"
+            rf"|(?P<word>\b{KeywordAutomaton.TOKEN.pattern})"
+        )
+        # Group numbers, since RE2 match objects only take numbered groups (and lastgroup is slow there)
+        self.title_group = self.master.groupindex['title']
+        self.group_names = {index: name for name, index in self.master.groupindex.items()}
+        self.heading_pattern = compile_document_pattern('|'.join(named_sections))
+        self.entity_pattern = compile_document_pattern(
+            rf"(?P<date>(?i:{'|'.join(date_patterns)}))|(?P<money>{money_pattern})"
+        )
+        self.entity_date_group = self.entity_pattern.groupindex['date']
+        self.party_pattern = compile_document_pattern(party_pattern)
+
+    def _scan_span(self, folded: str, text: str, start: int, end: int, cursor: KeywordCursor,
+                   headers: Dict[str, None], dates: Dict[str, None], amounts: Dict[str, None], base: int = 0):
+        # Words, nested headings, dates and amounts inside a header consumed by the master expression.
+        # A word that starts in the span but runs past its end is fed whole.
+        for match in KeywordAutomaton.TOKEN.finditer(folded, start, end):
+            word_end = match.end()
+            if word_end == end:
+                word_end = KeywordAutomaton.TOKEN.match(folded, match.start()).end()
+            cursor.feed(folded, match.start(), word_end, base)
+        # Search a slice rather than the whole text with pos/endpos, which the RE2 wrapper pays for
+        # in the length of the text. The slice keeps the span's first character so \b still sees it.
+        window = folded[start:min(len(folded), end + 64)]
+        for match in self.heading_pattern.finditer(window, 1):
+            if match.start() >= end - start:
+                break
+            heading_start, heading_end = start + match.start(), start + match.end()
+            if match.end() == len(window):
+                # Re-check against the full text so the trailing \b sees the next character
+                match = self.heading_pattern.match(folded, heading_start)
+                if not match:
+                    continue
+                heading_end = match.end()
+            headers[text[heading_start:heading_end].strip()] = None
+        # Dates and amounts may also run past the end of the span, as in "Section 5: payable on January 5, 2024"
+        for match in self.entity_pattern.finditer(window):
+            if match.start() >= end - start:
+                break
+            entity_start = start + match.start()
+            if match.end() == len(window):
+                match = self.entity_pattern.match(folded, entity_start)
+                if not match:
+                    continue
+                entity_end = match.end()
+            else:
+                entity_end = start + match.end()
+            if match.group(self.entity_date_group) is not None:
+                dates[text[entity_start:entity_end]] = None
+            else:
+                amounts[text[entity_start:entity_end]] = None
+
+    def scan(self, text: str) -> DocumentFeatures:
+        """Scan the document once and return its features"""
+        return self.scan_chunks(text_windows(text, SCAN_WINDOW_CHARS))
+
+    def scan_chunks(self, chunks: Iterable[str], overlap: Optional[int] = None) -> DocumentFeatures:
+        """Scan a document given as consecutive pieces (pages, windows) and return its features"""
+        return self.merge([(0, self.collect(chunks, overlap))])
+
+    def collect(self, chunks: Iterable[str], overlap: Optional[int] = None, party_limit: Optional[int] = 5) -> ScanFindings:
+        """Scan text given as consecutive pieces (pages, windows) and return what it contains.
+
+        Only a window of the most recent text is held. Each window is scanned
+        together with the last `overlap` characters of the one before, and a
+        match is only taken once it ends at least `overlap` characters before
+        the window's end, so any match shorter than the overlap is found
+        exactly as in one pass over the whole text.
+        """
+        overlap = SCAN_OVERLAP_CHARS if overlap is None else overlap
+        cursor = KeywordCursor(self.automaton)
+        offsets: Dict[str, List[int]] = {}
+        headers: Dict[str, None] = {}
+        dates: Dict[str, None] = {}
+        amounts: Dict[str, None] = {}
+        parties: Dict[str, None] = {}
+        word_count = 0
+
+        # "anchor.*follower" holds once a follower is seen on the same line as an earlier anchor
+        issues_found = [not followers for _, _, followers in self.issue_rules]
+        anchor_lines: Dict[str, int] = {}
+        followed_anchors: Dict[str, List[Tuple[int, str]]] = {}
+        for i, (_, anchor, followers) in enumerate(self.issue_rules):
+            anchor_lines[anchor] = -1
+            for follower in followers:
+                followed_anchors.setdefault(follower, []).append((i, anchor))
+        last_char = ' '
+
+        window = ''
+        base = 0            # document offset of window[0]
+        master_at = 0       # document offset each pattern resumes from
+        party_at = 0
+        line_at, line = 0, 0  # newlines counted up to document offset line_at
+
+        pieces = iter(chunks)
+        chunk = next(pieces, None)
+        while chunk is not None:
+            following = next(pieces, None)
+            final = following is None
+
+            # Word count as str.split() would give for the whole text
+            if chunk:
+                word_count += len(chunk.split())
+                if not last_char.isspace() and not chunk[0].isspace():
+                    word_count -= 1
+                last_char = chunk[-1]
+
+            window += chunk
+            folded = fold_case(window)
+            limit = len(window) if final else len(window) - overlap
+
+            for match in self.master.finditer(folded, master_at - base):
+                if match.end() > limit and match.start() >= limit - overlap:
+                    # May continue into the next chunk; rescan it with the next window
+                    master_at = base + max(master_at - base, min(match.start(), limit))
+                    break
+                master_at = base + match.end()
+                kind = self.group_names[match.lastindex]
+                if kind == 'word':
+                    cursor.feed(folded, match.start(), match.end(), base)
+                elif kind == 'section':
+                    headers[window[match.start(self.title_group):match.end(self.title_group)].strip()] = None
+                    self._scan_span(folded, window, match.start(), match.end(), cursor, headers, dates, amounts, base)
+                elif kind == 'heading':
+                    headers[window[match.start():match.end()].strip()] = None
+                    self._scan_span(folded, window, match.start(), match.end(), cursor, headers, dates, amounts, base)
+                elif kind == 'date':
+                    dates[window[match.start():match.end()]] = None
+                elif kind == 'money':
+                    amounts[match.group()] = None
+            else:
+                master_at = max(master_at, base + limit)
+
+            # Hits arrive in document order. Legal-issue words are single words, so they start in this window.
+            for keyword, start in cursor.hits:
+                keyword_offsets = offsets.setdefault(keyword, [])
+                if len(keyword_offsets) < self.MAX_KEYWORD_OFFSETS:
+                    keyword_offsets.append(start)
+                if keyword in anchor_lines or keyword in followed_anchors:
+                    line += window.count('\n', line_at - base, start - base)
+                    line_at = start
+                    for i, anchor in followed_anchors.get(keyword, ()):
+                        if anchor_lines[anchor] == line:
+                            issues_found[i] = True
+                    if keyword in anchor_lines:
+                        anchor_lines[keyword] = line
+            cursor.hits.clear()
+
+            # Only the first five distinct party names are used
+            parties_wanted = party_limit is None or len(parties) < party_limit
+            if parties_wanted:
+                for match in self.party_pattern.finditer(window, party_at - base):
+                    if match.end() > limit and match.start() >= limit - overlap:
+                        party_at = base + max(party_at - base, min(match.start(), limit))
+                        break
+                    party_at = base + match.end()
+                    parties[match.group()] = None
+                    if len(parties) == party_limit:
+                        parties_wanted = False
+                        break
+                else:
+                    party_at = max(party_at, base + limit)
+            resume_at = min(master_at, party_at) if parties_wanted else master_at
+
+            # Keep one character before the resume point for \b, plus the gap back to the last word
+            keep = max(min(resume_at - 1, cursor.last_end), base + len(window) - 2 * overlap - 1, base)
+            if keep > line_at:
+                line += window.count('\n', line_at - base, keep - base)
+                line_at = keep
+            window = window[keep - base:]
+            base = keep
+            chunk = following
+
+        return ScanFindings(
+            headers=list(headers),
+            dates=list(dates),
+            amounts=list(amounts),
+            parties=list(parties),
+            parties_complete=party_limit is None or len(parties) < party_limit,
+            keyword_offsets=offsets,
+            issues=[i for i, found in enumerate(issues_found) if found and self.issue_rules[i][2]],
+            word_count=word_count
+        )
+
+    def merge(self, pieces: List[Tuple[int, ScanFindings]], rescan=None) -> DocumentFeatures:
+        """Features of a document from the findings of consecutive pieces, each paired with its start offset.
+
+        Pieces must be cut where no match can span them. rescan(i) re-collects
+        piece i without a party limit, for when a piece stopped collecting party
+        names before the document had five.
+        """
+        headers: Dict[str, None] = {}
+        dates: Dict[str, None] = {}
+        amounts: Dict[str, None] = {}
+        parties: Dict[str, None] = {}
+        offsets: Dict[str, List[int]] = {}
+        issues_found = [not followers for _, _, followers in self.issue_rules]
+        word_count = 0
+        for i, (start, found) in enumerate(pieces):
+            headers.update(dict.fromkeys(found.headers))
+            dates.update(dict.fromkeys(found.dates))
+            amounts.update(dict.fromkeys(found.amounts))
+            if len(parties) < 5:
+                parties.update(dict.fromkeys(found.parties))
+                if len(parties) < 5 and not found.parties_complete and rescan is not None:
+                    parties.update(dict.fromkeys(rescan(i).parties))
+            for keyword, hits in found.keyword_offsets.items():
+                keyword_offsets = offsets.setdefault(keyword, [])
+                room = self.MAX_KEYWORD_OFFSETS - len(keyword_offsets)
+                if room > 0:
+                    keyword_offsets.extend(start + offset for offset in hits[:room])
+            for rule in found.issues:
+                issues_found[rule] = True
+            word_count += found.word_count
+
+        features = DocumentFeatures(
+            parties=[p.strip() for p in list(parties)[:5] if len(p.strip()) > 3],
+            dates=list(dates),
+            amounts=list(amounts),
+            section_headers=list(headers),
+            keyword_offsets=offsets,
+            word_count=word_count
+        )
+        features.legal_issues = [
+            label for (label, anchor, _), found in zip(self.issue_rules, issues_found)
+            if found and anchor in offsets
+        ]
+        return features
 
 # Free AI-powered text processing using rule-based approaches and simple heuristics
 class FreeTextAnalyzer:
@@ -60,7 +1350,7 @@ class FreeTextAnalyzer:
             'consideration', 'terms', 'conditions', 'obligations', 'rights',
             'liability', 'termination', 'breach', 'damages', 'clause', 'section'
         ]
-        
+
         self.legal_issues_patterns = [
             r'liability.*(?:limited|unlimited|excluded)',
             r'breach.*(?:contract|agreement)',
@@ -73,112 +1363,123 @@ class FreeTextAnalyzer:
             r'governing.*law',
             r'jurisdiction'
         ]
-        
+
         self.date_patterns = [
             r'\b\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4}\b',
-            r'\b\d{1,2}\s+(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{2,4}\b',
-            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{1,2},?\s+\d{2,4}\b'
+            r'\b\d{1,2}\s++(?:January|February|March|April|May|June|July|August|September|October|November|December)\s++\d{2,4}\b',
+            r'\b(?:January|February|March|April|May|June|July|August|September|October|November|December)\s++\d{1,2},?\s++\d{2,4}\b'
         ]
-    
-    def extract_entities(self, text: str) -> Dict:
+
+        # Common legal section headers (matched against lower-cased text)
+        self.section_patterns = [
+            r'(?:section|article|clause)\s++\d+[:\.\-]?\s*(?P<title>[^.\n]{10,100})',
+            r'\bdefinitions?\b',
+            r'\bterms?\s++and\s++conditions?\b',
+            r'\bpayment\s++terms?\b',
+            r'\btermination\b',
+            r'\bliability\b',
+            r'\bconfidentiality\b',
+            r'\bdispute\s++resolution\b',
+            r'\bgoverning\s++law\b',
+            r'\bforce\s++majeure\b'
+        ]
+
+        self.party_pattern = r'\b[A-Z][A-Z\s]{2,50}\b(?:\s++(?:LLC|Inc|Corp|Ltd|Company|Corporation))?'
+        self.money_pattern = r'\$[\d,]++(?:\.\d{2})?'
+
+        # Keyword tables, checked in order
+        self.document_type_keywords = [
+            ("Lease Agreement", ['lease', 'rental', 'tenant', 'landlord']),
+            ("Employment Contract", ['employment', 'employee', 'employer', 'salary', 'wages']),
+            ("Non-Disclosure Agreement", ['nda', 'confidentiality', 'non-disclosure']),
+            ("Service Agreement", ['ser e', 'services', 'provider', 'client']),
+            ("Purchase/Sale Agreement", ['purchase', 'sale', 'buy', 'sell', 'goods']),
+            ("License Agreement", ['license', 'licensing', 'software', 'intellectual property']),
+            ("Partnership Agreement", ['partnership', 'partners', 'joint venture'])
+        ]
+
+        self.issue_keywords = [
+            ("Contains penalty or damages clauses", ['penalty', 'liquidated damages']),
+            ("Contains warranty or guarantee provisions", ['warranty', 'guarantee']),
+            ("Includes arbitration clause", ['arbitration']),
+            ("Contains non-compete restrictions", ['non-compete', 'restraint of trade'])
+        ]
+
+        self.summary_risk_indicators = ['unlimited liability', 'personal guarantee', 'liquidated damages', 'immediate termination', 'penalty']
+
+        self.risk_indicators = [
+            'unlimited liability', 'personal guarantee', 'liquidated damages',
+            'immediate termination', 'no refund', 'non-negotiable',
+            'irrevocable', 'penalty', 'forfeiture'
+        ]
+
+        self.recommendation_keywords = [
+            ('confidentiality', "Pay special attention to confidentiality obligations"),
+            ('liability', "Review liability limitations and exclusions"),
+            ('governing law', "Note the governing law and jurisdiction clauses")
+        ]
+
+        keywords = [word for _, words in self.document_type_keywords for word in words]
+        keywords += [word for _, words in self.issue_keywords for word in words]
+        keywords += self.summary_risk_indicators + self.risk_indicators
+        keywords += [word for word, _ in self.recommendation_keywords]
+
+        # Compiled once at startup; every analysis step reads the features it produces
+        self.scanner = FeatureScanner(
+            keywords=keywords,
+            issue_patterns=self.legal_issues_patterns,
+            date_patterns=self.date_patterns,
+            section_patterns=self.section_patterns,
+            party_pattern=self.party_pattern,
+            money_pattern=self.money_pattern
+        )
+
+    def scan(self, text: str) -> DocumentFeatures:
+        """Collect all document features in a single pass"""
+        return self.scanner.scan(text)
+
+    def extract_entities(self, features: DocumentFeatures) -> Dict:
         """Extract legal entities using pattern matching"""
-        # Find potential party names (capitalized words/phrases)
-        party_pattern = r'\b[A-Z][A-Z\s]{2,50}\b(?:\s+(?:LLC|Inc|Corp|Ltd|Company|Corporation))?'
-        parties = list(set(re.findall(party_pattern, text)))[:5]  # Limit to 5 parties
-        
-        # Find dates
-        dates = []
-        for pattern in self.date_patterns:
-            dates.extend(re.findall(pattern, text, re.IGNORECASE))
-        dates = list(set(dates))[:5]  # Limit to 5 dates
-        
-        # Find amounts/financial terms
-        money_pattern = r'\$[\d,]+(?:\.\d{2})?'
-        amounts = list(set(re.findall(money_pattern, text)))[:5]
-        
         return {
-            'parties': [p.strip() for p in parties if len(p.strip()) > 3],
-            'dates': dates,
-            'amounts': amounts
+            'parties': features.parties,
+            'dates': features.dates[:5],  # Limit to 5 dates
+            'amounts': features.amounts[:5]
         }
-    
-    def classify_document_type(self, text: str) -> str:
+
+    def classify_document_type(self, features: DocumentFeatures) -> str:
         """Classify document type based on keywords"""
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['lease', 'rental', 'tenant', 'landlord']):
-            return "Lease Agreement"
-        elif any(word in text_lower for word in ['employment', 'employee', 'employer', 'salary', 'wages']):
-            return "Employment Contract"
-        elif any(word in text_lower for word in ['nda', 'confidentiality', 'non-disclosure']):
-            return "Non-Disclosure Agreement"
-        elif any(word in text_lower for word in ['ser e', 'services', 'provider', 'client']):
-            return "Service Agreement"
-        elif any(word in text_lower for word in ['purchase', 'sale', 'buy', 'sell', 'goods']):
-            return "Purchase/Sale Agreement"
-        elif any(word in text_lower for word in ['license', 'licensing', 'software', 'intellectual property']):
-            return "License Agreement"
-        elif any(word in text_lower for word in ['partnership', 'partners', 'joint venture']):
-            return "Partnership Agreement"
-        else:
-            return "Legal Contract"
-    
-    def identify_key_sections(self, text: str) -> List[str]:
+        for doc_type, words in self.document_type_keywords:
+            if features.count_present(words):
+                return doc_type
+        return "Legal Contract"
+
+    def identify_key_sections(self, features: DocumentFeatures, clause_tree: Optional[List[Dict]] = None) -> List[str]:
         """Identify key sections in the document"""
-        sections = []
-        
-        # Common legal section headers
-        section_patterns = [
-            r'(?:section|article|clause)\s+\d+[:\.\-]?\s*([^.\n]{10,100})',
-            r'\b(definitions?)\b',
-            r'\b(terms?\s+and\s+conditions?)\b',
-            r'\b(payment\s+terms?)\b',
-            r'\b(termination)\b',
-            r'\b(liability)\b',
-            r'\b(confidentiality)\b',
-            r'\b(dispute\s+resolution)\b',
-            r'\b(governing\s+law)\b',
-            r'\b(force\s+majeure)\b'
-        ]
-        
-        for pattern in section_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            sections.extend([match.strip() for match in matches if isinstance(match, str)])
-        
-        return list(set(sections))[:8]  # Limit to 8 sections
-    
-    def identify_legal_issues(self, text: str) -> List[str]:
+        if clause_tree:
+            # Outermost headings first, listed in document order
+            outermost = sorted(clause_tree, key=lambda node: (node["level"], node["start"]))[:8]
+            return [node["title"] for node in sorted(outermost, key=lambda node: node["start"])]
+        return features.section_headers[:8]  # Limit to 8 sections
+
+    def identify_legal_issues(self, features: DocumentFeatures) -> List[str]:
         """Identify potential legal issues"""
-        issues = []
-        
-        for pattern in self.legal_issues_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                issues.append(f"Contains {pattern.replace('.*', ' ').replace(r'\b', '').strip()} provisions")
-        
+        issues = list(features.legal_issues)
+
         # Additional heuristic checks
-        if 'penalty' in text.lower() or 'liquidated damages' in text.lower():
-            issues.append("Contains penalty or damages clauses")
-        
-        if 'warranty' in text.lower() or 'guarantee' in text.lower():
-            issues.append("Contains warranty or guarantee provisions")
-        
-        if 'arbitration' in text.lower():
-            issues.append("Includes arbitration clause")
-        
-        if 'non-compete' in text.lower() or 'restraint of trade' in text.lower():
-            issues.append("Contains non-compete restrictions")
-        
-        return list(set(issues))[:6]  # Limit to 6 issues
-    
-    def generate_summary(self, text: str, entities: Dict) -> str:
+        for issue, words in self.issue_keywords:
+            if features.count_present(words):
+                issues.append(issue)
+
+        return list(dict.fromkeys(issues))[:6]  # Limit to 6 issues
+
+    def generate_summary(self, features: DocumentFeatures, entities: Dict) -> str:
         """Generate a comprehensive summary using rule-based approach"""
-        doc_type = self.classify_document_type(text)
-        
+        doc_type = self.classify_document_type(features)
+
         summary_parts = [
             f"This appears to be a {doc_type.lower()} that requires careful review and consideration."
         ]
-        
+
         # Party information (always include this line)
         if entities['parties']:
             if len(entities['parties']) == 1:
@@ -187,57 +1488,50 @@ class FreeTextAnalyzer:
                 summary_parts.append(f"The main parties involved are {', '.join(entities['parties'][:3])}, each with distinct roles and responsibilities as defined in the contract terms.")
         else:
             summary_parts.append("The document involves multiple parties whose specific identities and roles should be carefully identified before proceeding with any commitments.")
-        
+
         # Temporal and financial information (ensure at least one more line)
         temporal_financial_added = False
         if entities['dates']:
             summary_parts.append(f"Important dates mentioned include {', '.join(entities['dates'][:3])}, which establish critical timelines for performance, compliance, and potential expiration of the agreement.")
             temporal_financial_added = True
-        
+
         if entities['amounts']:
             if temporal_financial_added:
                 summary_parts.append(f"The document specifies financial terms including {', '.join(entities['amounts'][:3])}, representing monetary obligations that require careful consideration of payment schedules and consequences.")
             else:
                 summary_parts.append(f"Financial terms include {', '.join(entities['amounts'][:3])}, establishing monetary obligations and payment structures that form a core component of this legal arrangement.")
                 temporal_financial_added = True
-        
+
         # Ensure we have at least one temporal/financial line if none were added
         if not temporal_financial_added:
             summary_parts.append("The document establishes specific timelines and may include financial obligations that should be thoroughly reviewed to understand all commitments and deadlines involved.")
-        
+
         # Content complexity and scope analysis (always include)
-        word_count = len(text.split())
-        legal_issues = self.identify_legal_issues(text)
+        word_count = features.word_count
+        legal_issues = self.identify_legal_issues(features)
         if word_count > 5000:
             summary_parts.append(f"This comprehensive document spans {word_count:,} words and contains {len(legal_issues)} distinct legal provisions, indicating a complex agreement that warrants professional legal review before execution.")
         elif word_count > 1000:
             summary_parts.append(f"This standard-length legal document contains {word_count:,} words with {len(legal_issues)} key legal provisions, representing a substantive agreement with multiple terms and conditions that require careful attention.")
         else:
             summary_parts.append(f"This concise document of {word_count:,} words focuses on essential terms while containing {len(legal_issues)} important legal provisions that, despite its brevity, establish significant legal obligations.")
-        
+
         # Risk and recommendation summary (always include)
-        risk_indicators = ['unlimited liability', 'personal guarantee', 'liquidated damages', 'immediate termination', 'penalty']
-        risk_count = sum(1 for indicator in risk_indicators if indicator in text.lower())
-        
+        risk_count = features.count_present(self.summary_risk_indicators)
+
         if risk_count >= 2:
             summary_parts.append("The document contains multiple high-risk provisions including potential penalties and liability terms, making it essential to understand all consequences and seek appropriate legal counsel before agreement.")
         elif risk_count >= 1:
             summary_parts.append("The document includes certain risk provisions that require careful evaluation, particularly regarding liability and termination terms, to ensure full understanding of potential obligations and consequences.")
         else:
             summary_parts.append("While appearing to contain standard legal provisions, this document establishes binding obligations and rights that should be thoroughly understood, with particular attention to compliance requirements and dispute resolution mechanisms.")
-        
+
         return " ".join(summary_parts)
-    
-    def assess_risk(self, text: str, legal_issues: List[str]) -> str:
+
+    def assess_risk(self, features: DocumentFeatures, legal_issues: List[str]) -> str:
         """Assess risk level based on document content"""
-        risk_indicators = [
-            'unlimited liability', 'personal guarantee', 'liquidated damages',
-            'immediate termination', 'no refund', 'non-negotiable',
-            'irrevocable', 'penalty', 'forfeiture'
-        ]
-        
-        high_risk_count = sum(1 for indicator in risk_indicators if indicator in text.lower())
-        
+        high_risk_count = features.count_present(self.risk_indicators)
+
         if high_risk_count >= 3:
             return "HIGH RISK: Document contains multiple potentially unfavorable terms. Careful review recommended before signing."
         elif high_risk_count >= 1:
@@ -246,11 +1540,11 @@ class FreeTextAnalyzer:
             return "MEDIUM RISK: Complex document with multiple legal provisions. Professional review recommended."
         else:
             return "LOW-MEDIUM RISK: Standard legal document. Review terms to ensure they meet your requirements."
-    
-    def generate_recommendations(self, text: str, doc_type: str, legal_issues: List[str]) -> List[str]:
+
+    def generate_recommendations(self, features: DocumentFeatures, doc_type: str, legal_issues: List[str]) -> List[str]:
         """Generate recommendations based on document analysis"""
         recommendations = []
-        
+
         # Basic recommendations based on document type
         if "employment" in doc_type.lower():
             recommendations.extend([
@@ -276,67 +1570,548 @@ class FreeTextAnalyzer:
                 "Verify party obligations and responsibilities",
                 "Check termination and dispute resolution procedures"
             ])
-        
+
         # Add specific recommendations based on content
-        if 'confidentiality' in text.lower():
-            recommendations.append("Pay special attention to confidentiality obligations")
-        
-        if 'liability' in text.lower():
-            recommendations.append("Review liability limitations and exclusions")
-        
-        if 'governing law' in text.lower():
-            recommendations.append("Note the governing law and jurisdiction clauses")
-        
+        for word, recommendation in self.recommendation_keywords:
+            if features.has(word):
+                recommendations.append(recommendation)
+
         return recommendations[:5]  # Limit to 5 recommendations
 
 # Initialize the analyzer
 analyzer = FreeTextAnalyzer()
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF file"""
+# Streaming upload ingestion: uploads are spooled to disk in chunks instead of read into memory
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 200 * 1024 * 1024))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", 1024 * 1024))
+
+# Leading bytes a file must (or, for text, must not) start with
+MAGIC_BYTES = {
+    '.pdf': b'%PDF-',
+    '.docx': b'PK\x03\x04',
+    '.zip': b'PK\x03\x04',
+}
+SNIFF_BYTES = 1024
+
+def unsupported_type_message(extensions: Tuple[str, ...]) -> str:
+    names = [extension[1:].upper() for extension in extensions]
+    return f"Only {', '.join(names[:-1])}, and {names[-1]} files are supported"
+
+class SpooledUpload:
+    """One uploaded file, hashed, type-sniffed and size-checked while it streams in.
+
+    Data stays in memory up to UPLOAD_SPOOL_BYTES and then moves to a named
+    temporary file, so the parsers (and pool workers) can read it from disk.
+    """
+
+    def __init__(self, filename: str, max_bytes: Optional[int] = None, spool_bytes: Optional[int] = None):
+        self.filename = filename
+        self.extension = os.path.splitext(filename.lower())[1]
+        self.max_bytes = UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+        self.spool_bytes = UPLOAD_SPOOL_BYTES if spool_bytes is None else spool_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.head = b""
+        self.sniffed = False
+        self.buffer: Optional[io.BytesIO] = io.BytesIO()
+        self.file = None
+        self.path: Optional[str] = None
+
+    def _sniff(self):
+        self.sniffed = True
+        if self.extension == '.pdf':
+            # The PDF header may be preceded by junk, as long as it is within the first 1024 bytes
+            matches = MAGIC_BYTES['.pdf'] in self.head
+        elif self.extension in MAGIC_BYTES:
+            matches = self.head.startswith(MAGIC_BYTES[self.extension])
+        else:
+            # Plain text only has to not be one of the binary formats
+            matches = not any(self.head.startswith(signature) for signature in MAGIC_BYTES.values())
+        if not matches:
+            raise HTTPException(status_code=400, detail=f"File content does not match the {self.extension} extension")
+
+    def write(self, data: bytes):
+        """Append a chunk of the upload"""
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"File exceeds the {self.max_bytes:,} byte upload limit")
+        self.digest.update(data)
+        if not self.sniffed:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._sniff()
+
+        if self.file is not None:
+            self.file.write(data)
+            return
+        self.buffer.write(data)
+        if self.buffer.tell() > self.spool_bytes:
+            self.file = tempfile.NamedTemporaryFile(prefix="clausewise-", suffix=self.extension, delete=False)
+            self.path = self.file.name
+            self.file.write(self.buffer.getbuffer())
+            self.buffer = None
+
+    def finish(self):
+        """Called once the whole file has arrived"""
+        if not self.sniffed:
+            self._sniff()
+        if self.file is not None:
+            self.file.close()
+
+    @property
+    def content_hash(self) -> str:
+        return self.digest.hexdigest()
+
+    def source(self) -> Union[bytes, str]:
+        """What the extractors read: the bytes of a small upload, or the path of a spooled one"""
+        return self.path if self.path else self.buffer.getvalue()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.file = None
+        self.buffer = None
+
+class UploadReceiver:
+    """Streaming multipart/form-data reader for upload requests.
+
+    File parts are validated as soon as their headers arrive and written
+    chunk by chunk to SpooledUploads, so an unsupported, mislabelled or
+    oversized file is rejected before the rest of the body is read.
+    """
+
+    def __init__(self, request: Request, max_files: int = 1, max_field_bytes: int = 64 * 1024,
+                 extensions: Tuple[str, ...] = SUPPORTED_EXTENSIONS, spool_bytes: Optional[int] = None,
+                 max_total_bytes: Optional[int] = None):
+        self.request = request
+        self.max_files = max_files
+        # Bytes of file data accepted across all files of the request
+        self.max_total_bytes = max_files * UPLOAD_MAX_BYTES if max_total_bytes is None else max_total_bytes
+        self.received_bytes = 0
+        self.max_field_bytes = max_field_bytes
+        self.extensions = extensions
+        self.spool_bytes = spool_bytes
+        self.uploads: List[SpooledUpload] = []
+        self.fields: Dict[str, str] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._current: Optional[SpooledUpload] = None
+        self._field_name: Optional[str] = None
+        self._field_data = b""
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._current = None
+        self._field_name = None
+        self._field_data = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if b"filename" not in options:
+            self._field_name = name
+            return
+
+        filename = options[b"filename"].decode("utf-8", errors="replace")
+        if len(self.uploads) >= self.max_files:
+            raise HTTPException(status_code=400, detail=f"At most {self.max_files} file(s) may be uploaded per request")
+        if not filename.lower().endswith(self.extensions):
+            raise HTTPException(status_code=400, detail=unsupported_type_message(self.extensions))
+        self._current = SpooledUpload(filename, spool_bytes=self.spool_bytes)
+        self.uploads.append(self._current)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._current is not None:
+            self.received_bytes += end - start
+            if self.received_bytes > self.max_total_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds the {self.max_total_bytes:,} byte limit")
+            self._current.write(data[start:end])
+        else:
+            self._field_data += data[start:end]
+            if len(self._field_data) > self.max_field_bytes:
+                raise HTTPException(status_code=413, detail="Form field too large")
+
+    def on_part_end(self):
+        if self._current is not None:
+            self._current.finish()
+        elif self._field_name is not None:
+            self.fields[self._field_name] = self._field_data.decode("utf-8", errors="replace")
+
+    async def receive(self) -> Tuple[List[SpooledUpload], Dict[str, str]]:
+        """Read the request body; returns the uploaded files and plain form fields"""
+        content_type, params = parse_options_header(self.request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+        # Reject on the declared length before reading anything
+        content_length = self.request.headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > self.max_total_bytes + self.max_field_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the {self.max_total_bytes:,} byte limit")
+
+        parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        })
+        try:
+            async for chunk in self.request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        except Exception:
+            self.close()
+            raise
+        return self.uploads, self.fields
+
+    def close(self):
+        for upload in self.uploads:
+            upload.close()
+
+@contextmanager
+def open_source(source: Union[bytes, str]):
+    """Open extractor input (in-memory bytes or a spooled file path) as a binary file"""
+    if isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+    else:
+        with open(source, 'rb') as fh:
+            yield fh
+
+# Page-parallel PDF extraction
+PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", 0))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 32))
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", 10))
+if PDF_PAGE_TIMEOUT > 0 and not hasattr(signal, "setitimer"):
+    logger.warning("PDF_PAGE_TIMEOUT needs SIGALRM, which this platform lacks; PDF pages are extracted without a timeout")
+    PDF_PAGE_TIMEOUT = 0
+
+pdf_page_pool: Optional[ProcessPoolExecutor] = None
+pdf_page_pool_lock = threading.Lock()
+
+class PageTimeout(BaseException):
+    """Raised by SIGALRM inside a page; a BaseException so PyPDF2's own error handling cannot swallow it"""
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+def extract_pdf_page_range(source: Union[bytes, str], start: int, stop: int, timeout: float) -> List[str]:
+    """Extract pages [start, stop) of a PDF, giving each page at most timeout seconds"""
+    # Timeouts use SIGALRM, which is only available on the main thread of a process
+    use_alarm = timeout > 0 and threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    pages = []
+    try:
+        with open_source(source) as fh:
+            pdf_reader = PyPDF2.PdfReader(fh)
+            for number in range(start, stop):
+                # Load the page outside the timer so an interrupt cannot leave the page tree half-read
+                page = pdf_reader.pages[number]
+                try:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, timeout)
+                    pages.append(page.extract_text())
+                except PageTimeout:
+                    logger.warning(f"PDF page {number + 1} took longer than {timeout}s; skipping it")
+                    pages.append("")
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous_handler)
+    return pages
+
+def get_pdf_page_pool() -> ProcessPoolExecutor:
+    global pdf_page_pool
+    with pdf_page_pool_lock:
+        if pdf_page_pool is None:
+            # Every analysis thread may be extracting a PDF here at once to get the page timeout
+            pdf_page_pool = ProcessPoolExecutor(max_workers=max(1, PDF_PAGE_WORKERS, analysis_executor.workers))
+        return pdf_page_pool
+
+def pdf_page_results(futures: List[Future]) -> List[str]:
+    """Pages from page-range futures, in order; gives up once the upload has timed out.
+
+    The ranges not yet started are cancelled then, so an abandoned upload does not
+    keep the pool busy ahead of the next ones.
+    """
+    deadline = time.monotonic() + analysis_executor.timeout if analysis_executor.timeout > 0 else None
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text.strip()
+        return [page for future in futures
+                for page in future.result(None if deadline is None else max(0.0, deadline - time.monotonic()))]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+def extract_pdf_pages(source: Union[bytes, str]) -> Tuple[str, List[int]]:
+    """Extract text from PDF file, returning the text and the offset where each page starts"""
+    try:
+        with open_source(source) as fh:
+            page_count = len(PyPDF2.PdfReader(fh).pages)
+
+        if PDF_PAGE_WORKERS > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+            # A few ranges per worker so one slow range does not leave the others idle
+            chunk = -(-page_count // (PDF_PAGE_WORKERS * 4))
+            pages = pdf_page_results([
+                get_pdf_page_pool().submit(extract_pdf_page_range, source, start, min(start + chunk, page_count), PDF_PAGE_TIMEOUT)
+                for start in range(0, page_count, chunk)
+            ])
+        elif PDF_PAGE_TIMEOUT > 0 and threading.current_thread() is not threading.main_thread():
+            # SIGALRM only reaches a process's main thread, so from an analysis thread the pages go to a pool process
+            pages = pdf_page_results([get_pdf_page_pool().submit(extract_pdf_page_range, source, 0, page_count, PDF_PAGE_TIMEOUT)])
+        else:
+            pages = extract_pdf_page_range(source, 0, page_count, PDF_PAGE_TIMEOUT)
+
+        # Join once, recording page starts, then strip as before and shift the offsets to match
+        page_offsets = []
+        position = 0
+        for page in pages:
+            page_offsets.append(position)
+            position += len(page) + 1
+        text = "\n".join(pages)
+        leading = len(text) - len(text.lstrip())
+        return text.strip(), [max(0, offset - leading) for offset in page_offsets]
     except Exception as e:
         logger.error(f"Error extracting text from PDF: {e}")
         raise HTTPException(status_code=400, detail="Failed to extract text from PDF")
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX file"""
+# Streaming DOCX extraction straight from the package XML
+WORDML_NAMESPACES = (
+    "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+    "http://purl.oclc.org/ooxml/wordprocessingml/main",  # strict OOXML
+)
+WORDML_TAGS = {f"{{{ns}}}{name}": name for ns in WORDML_NAMESPACES for name in (
+    "body", "hdr", "ftr", "footnote", "endnote", "p", "r", "t", "tab", "ptab", "br", "cr",
+    "noBreakHyphen", "tbl", "tr", "tc", "txbxContent",
+)}
+# Alternate content repeats a drawing's text in its fallback; only the primary choice is read
+SKIPPED_TAGS = {"{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback"}
+BREAK_TYPE_ATTRIBUTES = tuple(f"{{{ns}}}type" for ns in WORDML_NAMESPACES)
+
+# Parts read after the body; set DOCX_EXTRA_PARTS="" to read the body only
+DOCX_EXTRA_PARTS = tuple(part for part in os.getenv("DOCX_EXTRA_PARTS", "header,footer,footnotes,endnotes").split(",") if part)
+
+def iter_wordml_lines(stream) -> Iterator[str]:
+    """Yield one line per paragraph or table row of a WordprocessingML part, in document order"""
+    tables = []  # per open table: [cells of the current row, paragraphs of the current cell]
+    text_boxes = []  # per open text box: the anchoring paragraph and run depth it interrupted
+    paragraph = None
+    run_depth = 0
+    skip_depth = 0
+    depth = 0
+    container = None  # body, header, footer or note whose finished children are released
+    container_depth = 0
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            depth += 1
+            if skip_depth or tag in SKIPPED_TAGS:
+                skip_depth += 1
+                continue
+            name = WORDML_TAGS.get(tag)
+            if name == "p":
+                if paragraph is None:
+                    paragraph = []
+            elif name == "r":
+                run_depth += 1
+            elif name == "tbl":
+                tables.append([[], []])
+            elif name == "txbxContent":
+                # A text box's paragraphs become lines of their own, ahead of the paragraph anchoring it
+                text_boxes.append((paragraph, run_depth))
+                paragraph, run_depth = None, 0
+            elif name in ("body", "hdr", "ftr", "footnote", "endnote"):
+                container, container_depth = element, depth
+            continue
+
+        depth -= 1
+        if skip_depth:
+            skip_depth -= 1
+        else:
+            name = WORDML_TAGS.get(tag)
+            if name is None:
+                pass
+            elif name == "t":
+                if paragraph is not None and element.text:
+                    paragraph.append(element.text)
+            elif name == "r":
+                run_depth -= 1
+            elif run_depth and paragraph is not None and name in ("tab", "ptab"):
+                # Outside a run, w:tab is a tab stop definition rather than a character
+                paragraph.append("\t")
+            elif run_depth and paragraph is not None and name == "br":
+                break_type = next((element.get(attribute) for attribute in BREAK_TYPE_ATTRIBUTES if attribute in element.attrib), "textWrapping")
+                if break_type == "textWrapping":
+                    paragraph.append("\n")
+            elif run_depth and paragraph is not None and name == "cr":
+                paragraph.append("\n")
+            elif run_depth and paragraph is not None and name == "noBreakHyphen":
+                paragraph.append("-")
+            elif name == "p" and paragraph is not None:
+                line = "".join(paragraph)
+                paragraph = None
+                if tables:
+                    tables[-1][1].append(line)
+                else:
+                    yield line
+            elif name == "tc" and tables:
+                row, cell = tables[-1]
+                row.append("\n".join(cell))
+                cell.clear()
+            elif name == "tr" and tables:
+                row = tables[-1][0]
+                line = "\t".join(row)
+                row.clear()
+                if len(tables) > 1:
+                    # A nested table's rows become lines of the enclosing cell
+                    tables[-2][1].append(line)
+                else:
+                    yield line
+            elif name == "tbl" and tables:
+                tables.pop()
+            elif name == "txbxContent" and text_boxes:
+                paragraph, run_depth = text_boxes.pop()
+        if container is not None and depth == container_depth:
+            # A top-level block is done: drop it so memory stays bounded by one paragraph or table
+            container.clear()
+
+def docx_part_names(archive: zipfile.ZipFile) -> List[str]:
+    """word/document.xml followed by the configured header, footer and note parts"""
+    names = ["word/document.xml"]
+    members = archive.namelist()
+    for part in DOCX_EXTRA_PARTS:
+        pattern = re.compile(rf"word/{re.escape(part.strip())}\d*\.xml")
+        names.extend(sorted((name for name in members if pattern.fullmatch(name)), key=lambda name: (len(name), name)))
+    return names
+
+def extract_text_from_docx(source: Union[bytes, str]) -> str:
+    """Extract text from DOCX file: body paragraphs and tables, then headers, footers and notes"""
     try:
-        doc = Document(io.BytesIO(file_content))
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text.strip()
+        with open_source(source) as fh, zipfile.ZipFile(fh) as archive:
+            lines = []
+            seen_extra = set()
+            for part in docx_part_names(archive):
+                with archive.open(part) as stream:
+                    if part == "word/document.xml":
+                        lines.extend(iter_wordml_lines(stream))
+                        continue
+                    # Sections usually repeat the same header and footer; keep each distinct line once
+                    for line in iter_wordml_lines(stream):
+                        if line.strip() and line not in seen_extra:
+                            seen_extra.add(line)
+                            lines.append(line)
+        return "\n".join(lines).strip()
     except Exception as e:
         logger.error(f"Error extracting text from DOCX: {e}")
         raise HTTPException(status_code=400, detail="Failed to extract text from DOCX")
 
-def extract_text_from_txt(file_content: bytes) -> str:
-    """Extract text from TXT file"""
+# TXT decoding: the encoding comes from a byte-order mark, or from a sample of the file
+TEXT_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),  # before UTF-16, whose little-endian BOM is a prefix of it
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+TXT_SAMPLE_BYTES = int(os.getenv("TXT_SAMPLE_BYTES", 64 * 1024))
+# Used when the text is not valid UTF-8; undefined bytes fall back to Latin-1, which accepts anything
+TXT_FALLBACK_ENCODING = os.getenv("TXT_FALLBACK_ENCODING", "cp1252")
+TEXT_UNIT_WIDTHS = {"utf-16-le": 2, "utf-16-be": 2, "utf-32-le": 4, "utf-32-be": 4}
+ASCII_WHITESPACE = frozenset(b" \t\n\r\x0b\x0c")
+
+def detect_text_encoding(sample) -> Tuple[Optional[str], int]:
+    """Encoding named by a BOM, or UTF-16 recognised by its zero bytes, with the BOM length; None if undecided"""
+    for bom, encoding in TEXT_BOMS:
+        if sample[:len(bom)] == bom:
+            return encoding, len(bom)
+    # BOM-less UTF-16 from older Windows tools: mostly-ASCII text has a zero in every other byte
+    even_zeros = sample[0::2].count(0)
+    odd_zeros = sample[1::2].count(0)
+    units = len(sample) // 2
+    if units and max(even_zeros, odd_zeros) > 0.4 * units and min(even_zeros, odd_zeros) < 0.05 * units:
+        return ("utf-16-le" if odd_zeros > even_zeros else "utf-16-be"), 0
+    return None, 0
+
+def strip_encoded(view: memoryview, encoding: str) -> memoryview:
+    """Trim ASCII whitespace from both ends of encoded text without copying it"""
+    width = TEXT_UNIT_WIDTHS.get(encoding, 1)
+    byteorder = "big" if encoding.endswith("-be") else "little"
+    start, end = 0, len(view) - len(view) % width
+    while start < end and int.from_bytes(view[start:start + width], byteorder) in ASCII_WHITESPACE:
+        start += width
+    while end > start and int.from_bytes(view[end - width:end], byteorder) in ASCII_WHITESPACE:
+        end -= width
+    return view[start:end]
+
+def decode_text(data) -> Tuple[str, str]:
+    """Decode the bytes of a text file, returning the text (stripped) and the encoding used"""
+    view = memoryview(data)
+    encoding, bom_length = detect_text_encoding(view[:TXT_SAMPLE_BYTES].tobytes())
+    candidates = [encoding] if encoding else ["utf-8", TXT_FALLBACK_ENCODING, "latin-1"]
+    body = view[bom_length:]
+    for candidate in candidates:
+        # Decode from the buffer directly; trimming first means strip() below rarely has to copy
+        try:
+            errors = "replace" if candidate == candidates[-1] else "strict"
+            return str(strip_encoded(body, candidate), candidate, errors).strip(), candidate
+        except UnicodeDecodeError:
+            continue
+
+def extract_txt(source: Union[bytes, str]) -> Tuple[str, str]:
+    """Extract text from TXT file, returning the text and its detected encoding"""
     try:
-        return file_content.decode('utf-8', errors='ignore').strip()
+        if isinstance(source, (bytes, bytearray)):
+            return decode_text(source)
+        if os.path.getsize(source) == 0:
+            return "", "utf-8"
+        # Decode straight from the mapped file, without reading it into a bytes object first
+        with open(source, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_text(mapped)
     except Exception as e:
         logger.error(f"Error extracting text from TXT: {e}")
         raise HTTPException(status_code=400, detail="Failed to extract text from TXT")
 
-def analyze_document(text: str) -> Dict:
+def analyze_document(text: str, features: Optional[DocumentFeatures] = None,
+                     clause_tree: Optional[List[Dict]] = None) -> Dict:
     """Analyze document and return structured summary"""
     try:
+        # Scan the document once; every step below reads from the features
+        if features is None:
+            features = analyzer.scan(text)
+        
         # Extract entities and basic info
-        entities = analyzer.extract_entities(text)
-        doc_type = analyzer.classify_document_type(text)
-        key_sections = analyzer.identify_key_sections(text)
-        legal_issues = analyzer.identify_legal_issues(text)
+        entities = analyzer.extract_entities(features)
+        doc_type = analyzer.classify_document_type(features)
+        key_sections = analyzer.identify_key_sections(features, clause_tree)
+        legal_issues = analyzer.identify_legal_issues(features)
         
         # Generate analysis
-        summary = analyzer.generate_summary(text, entities)
-        risk_assessment = analyzer.assess_risk(text, legal_issues)
-        recommendations = analyzer.generate_recommendations(text, doc_type, legal_issues)
+        summary = analyzer.generate_summary(features, entities)
+        risk_assessment = analyzer.assess_risk(features, legal_issues)
+        recommendations = analyzer.generate_recommendations(features, doc_type, legal_issues)
         
         return {
             "document_type": doc_type,
@@ -370,70 +2145,409 @@ def analyze_document(text: str) -> Dict:
             "analysis_timestamp": datetime.now().isoformat()
         }
 
-def answer_question(question: str, document_text: str) -> Dict:
+# Per-document sentence index, so follow-up questions only read the postings for their terms
+class SentenceIndex:
+    """Sentences of a document (as offsets) and a BM25 index over their words.
+
+    Postings are stored term-major in flat arrays (CSR layout): the sentences
+    containing a term are sentence_ids[start:end] with matching frequencies,
+    where (start, end) = postings[term].
+    """
+
+    TOKEN = re.compile(r'\w+')
+    SEPARATOR = '. '
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, text: Union[str, CompactText]):
+        # Only offsets are kept; a stored document's compact text is sliced when a sentence is returned
+        self.text = text
+        text = str(text)
+        starts, ends = array('I'), array('I')
+        start = 0
+        while True:
+            end = text.find(self.SEPARATOR, start)
+            if end < 0:
+                end = len(text)
+            # Trim surrounding whitespace here so span() needs no access to the text
+            trimmed_start, trimmed_end = start, end
+            while trimmed_start < trimmed_end and text[trimmed_start].isspace():
+                trimmed_start += 1
+            while trimmed_end > trimmed_start and text[trimmed_end - 1].isspace():
+                trimmed_end -= 1
+            starts.append(trimmed_start)
+            ends.append(trimmed_end)
+            if end == len(text):
+                break
+            start = end + len(self.SEPARATOR)
+        self.starts = starts
+        self.ends = ends
+
+        folded = fold_case(text)
+        lengths = array('I')
+        term_sentences: Dict[str, List[int]] = {}
+        term_frequencies: Dict[str, List[int]] = {}
+        for sentence_id in range(len(starts)):
+            tokens = self.TOKEN.findall(folded, starts[sentence_id], ends[sentence_id])
+            lengths.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                sentences = term_sentences.get(term)
+                if sentences is None:
+                    term_sentences[term] = [sentence_id]
+                    term_frequencies[term] = [frequency]
+                else:
+                    sentences.append(sentence_id)
+                    term_frequencies[term].append(frequency)
+
+        self.sentence_ids = array('I')
+        self.frequencies = array('I')
+        self.postings: Dict[str, Tuple[int, int]] = {}
+        for term, sentences in term_sentences.items():
+            offset = len(self.sentence_ids)
+            self.sentence_ids.extend(sentences)
+            self.frequencies.extend(term_frequencies[term])
+            self.postings[term] = (offset, len(self.sentence_ids))
+        self.lengths = lengths
+
+        # Per-sentence BM25 length normalisation, k1 * (1 - b + b * len / avgdl)
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        scale = self.K1 * self.B / average_length
+        base = self.K1 * (1 - self.B)
+        self.vectorized = np is not None
+        if self.vectorized:
+            self.norms = base + scale * np.frombuffer(lengths, dtype=np.uint32).astype(np.float64)
+        else:
+            self.norms = [base + scale * length for length in lengths]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def span(self, sentence_id: int) -> Tuple[int, int]:
+        """Offsets of a sentence in the document text, without surrounding whitespace"""
+        return self.starts[sentence_id], self.ends[sentence_id]
+
+    def sentence(self, sentence_id: int) -> str:
+        start, end = self.span(sentence_id)
+        return self.text[start:end]
+
+    def term_counts(self) -> Dict[str, int]:
+        """Occurrences of each term in the whole document"""
+        return {term: sum(self.frequencies[start:end]) for term, (start, end) in self.postings.items()}
+
+    def idf(self, document_frequency: int) -> float:
+        total = len(self.starts)
+        return math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def rank(self, keywords: List[str], limit: int) -> List[Tuple[int, float]]:
+        """(sentence_id, BM25 score) for the best scoring sentences, in document order on ties"""
+        terms = [(self.postings[term], weight) for term, weight in Counter(keywords).items() if term in self.postings]
+        if not terms or limit <= 0:
+            return []
+        if not self.vectorized:
+            return self._rank_python(terms, limit)
+
+        scores = np.zeros(len(self.starts), dtype=np.float64)
+        sentence_ids = np.frombuffer(self.sentence_ids, dtype=np.uint32)
+        frequencies = np.frombuffer(self.frequencies, dtype=np.uint32)
+        for (start, end), weight in terms:
+            ids = sentence_ids[start:end]
+            tf = frequencies[start:end]
+            scores[ids] += weight * self.idf(end - start) * tf * (self.K1 + 1) / (tf + self.norms[ids])
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            # Partial sort for the k-th best score, then keep everything tied with it so ties break by position
+            kth = -np.partition(-scores[candidates], limit - 1)[limit - 1]
+            candidates = candidates[scores[candidates] >= kth]
+        best = sorted(candidates.tolist(), key=lambda sentence_id: (-scores[sentence_id], sentence_id))[:limit]
+        return [(sentence_id, float(scores[sentence_id])) for sentence_id in best]
+
+    def _rank_python(self, terms: List[Tuple[Tuple[int, int], int]], limit: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for (start, end), weight in terms:
+            idf = weight * self.idf(end - start) * (self.K1 + 1)
+            for position in range(start, end):
+                sentence_id = self.sentence_ids[position]
+                tf = self.frequencies[position]
+                scores[sentence_id] = scores.get(sentence_id, 0.0) + idf * tf / (tf + self.norms[sentence_id])
+        return heapq.nsmallest(limit, ((sentence_id, score) for sentence_id, score in scores.items()),
+                               key=lambda item: (-item[1], item[0]))
+
+class SentenceIndexCache:
+    """LRU of sentence indexes by document id; indexes are built after upload or on first question.
+
+    A document's fact sheet is kept beside its index once a question has needed
+    it, so a warm question reads neither the stored text nor the stored facts.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, SentenceIndex]" = OrderedDict()
+        self.facts: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def get(self, document_id: str, text: str) -> SentenceIndex:
+        with self.lock:
+            index = self.entries.get(document_id)
+            if index is not None:
+                self.entries.move_to_end(document_id)
+                return index
+        index = SentenceIndex(text)
+        self.put(document_id, index)
+        return index
+
+    def get_with_facts(self, document_id: str) -> Optional[Tuple[SentenceIndex, Dict]]:
+        """The cached index and fact sheet of a document, or None unless both are cached"""
+        with self.lock:
+            index = self.entries.get(document_id)
+            facts = self.facts.get(document_id)
+            if index is None or facts is None:
+                return None
+            self.entries.move_to_end(document_id)
+            return index, facts
+
+    def put(self, document_id: str, index: SentenceIndex, facts: Optional[Dict] = None):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[document_id] = index
+            self.entries.move_to_end(document_id)
+            if facts is not None:
+                self.facts[document_id] = facts
+            while len(self.entries) > self.max_entries:
+                evicted, _ = self.entries.popitem(last=False)
+                self.facts.pop(evicted, None)
+
+    def discard(self, document_id: str):
+        with self.lock:
+            self.entries.pop(document_id, None)
+            self.facts.pop(document_id, None)
+
+sentence_indexes = SentenceIndexCache(int(os.getenv("SENTENCE_INDEX_CACHE_ENTRIES", 64)))
+
+# Cross-document search: document-level BM25 over term -> {document_id: frequency} postings
+class SearchIndex:
+    """Inverted index over every stored document, updated as documents are added and removed.
+
+    A query only visits the postings of its own terms, so its cost follows how
+    many documents contain those terms rather than how many documents exist.
+    Documents added or deleted by other workers are picked up by sync(), which
+    a background task runs every sync_interval seconds.
+    """
+
+    SYNC_PAGE = 500
+
+    def __init__(self, sync_interval: float, lookback: float):
+        self.sync_interval = sync_interval
+        self.lookback = lookback
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.document_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+        # Newest upload_time and deleted_at seen by sync; deletions before this worker started do not matter
+        self.uploaded_watermark: Optional[str] = None
+        self.deleted_watermark = datetime.now().isoformat()
+        self.syncs = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def terms(query: str) -> List[str]:
+        return SentenceIndex.TOKEN.findall(fold_case(query))
+
+    def add(self, document_id: str, index: SentenceIndex):
+        counts = index.term_counts()
+        length = sum(index.lengths)
+        with self.lock:
+            if document_id in self.lengths:
+                return
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, {})[document_id] = frequency
+            self.document_terms[document_id] = list(counts)
+            self.lengths[document_id] = length
+            self.total_length += length
+
+    def remove(self, document_id: str):
+        with self.lock:
+            length = self.lengths.pop(document_id, None)
+            if length is None:
+                return
+            self.total_length -= length
+            for term in self.document_terms.pop(document_id):
+                documents = self.postings[term]
+                del documents[document_id]
+                if not documents:
+                    del self.postings[term]
+
+    def search(self, terms: List[str], limit: int) -> List[Tuple[str, float]]:
+        """(document_id, BM25 score) for the best matching documents"""
+        k1, b = SentenceIndex.K1, SentenceIndex.B
+        scores: Dict[str, float] = {}
+        with self.lock:
+            total = len(self.lengths)
+            if not total:
+                return []
+            average_length = (self.total_length / total) or 1.0
+            for term, weight in Counter(terms).items():
+                documents = self.postings.get(term)
+                if not documents:
+                    continue
+                idf = weight * math.log(1 + (total - len(documents) + 0.5) / (len(documents) + 0.5)) * (k1 + 1)
+                for document_id, tf in documents.items():
+                    norm = k1 * (1 - b + b * self.lengths[document_id] / average_length)
+                    scores[document_id] = scores.get(document_id, 0.0) + idf * tf / (tf + norm)
+        return heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _rewind(self, watermark: str) -> str:
+        # Re-read a little before the watermark, for rows another worker committed late
+        return (datetime.fromisoformat(watermark) - timedelta(seconds=self.lookback)).isoformat()
+
+    def sync(self, store: DocumentStore):
+        """Pick up documents added or deleted by other workers sharing the store since the last sync.
+
+        New documents are read a page at a time in upload order from the
+        watermark; their sentence indexes are built here and not kept in the
+        sentence index cache, so a sync does not evict the documents being asked about.
+        """
+        for deleted_at, document_id in store.deleted_since(self._rewind(self.deleted_watermark)):
+            self.remove(document_id)
+            self.deleted_watermark = max(self.deleted_watermark, deleted_at)
+
+        since = self._rewind(self.uploaded_watermark) if self.uploaded_watermark is not None else None
+        after = None
+        while True:
+            page = store.page(self.SYNC_PAGE, after=after, since=since)
+            for summary in page:
+                with self.lock:
+                    indexed = summary["document_id"] in self.lengths
+                if not indexed:
+                    document = store.get(summary["document_id"])
+                    if document is not None:
+                        self.add(summary["document_id"], SentenceIndex(document["text"]))
+                self.uploaded_watermark = max(self.uploaded_watermark or "", summary["upload_time"])
+            if len(page) < self.SYNC_PAGE:
+                break
+            after = DocumentListing.key(page[-1])
+        self.syncs += 1
+
+    async def run(self, store: DocumentStore):
+        """Background loop: sync every sync_interval seconds, off the event loop"""
+        while True:
+            try:
+                await asyncio.to_thread(self.sync, store)
+            except Exception as e:
+                logger.error(f"Error syncing search index: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "documents": len(self.lengths),
+                "terms": len(self.postings),
+                "syncs": self.syncs,
+                "uploaded_watermark": self.uploaded_watermark
+            }
+
+search_index = SearchIndex(
+    sync_interval=float(os.getenv("SEARCH_SYNC_SECONDS", 5)),
+    lookback=float(os.getenv("SEARCH_SYNC_LOOKBACK_SECONDS", 60))
+)
+search_sync_task: Optional[asyncio.Task] = None
+
+def index_document(document_id: str, text: str):
+    """Build the sentence index for a document and add it to the cross-document search index"""
+    search_index.add(document_id, sentence_indexes.get(document_id, text))
+
+def index_in_background(document_id: str, text: str):
+    """Index a freshly uploaded document without holding up the upload response"""
+    asyncio.get_running_loop().run_in_executor(None, index_document, document_id, text)
+
+class QuestionContext:
+    """Per-document state for answering questions, computed at most once however many are asked"""
+
+    def __init__(self, document_text: Union[str, CompactText], index: Optional[SentenceIndex] = None, facts: Optional[Dict] = None):
+        self.document_text = document_text
+        self._index = index
+        self._facts = facts
+
+    @property
+    def index(self) -> SentenceIndex:
+        if self._index is None:
+            self._index = SentenceIndex(self.document_text)
+        return self._index
+
+    @property
+    def facts(self) -> Dict:
+        # Documents stored before fact sheets existed get one built on first use
+        if self._facts is None:
+            text = str(self.document_text)
+            self._facts = build_fact_sheet(text, analyzer.scan(text))
+        return self._facts
+
+def answer_question(question: str, document_text: Union[str, CompactText], index: Optional[SentenceIndex] = None,
+                    context: Optional[QuestionContext] = None) -> Dict:
     """Answer questions about the document using simple text matching"""
     try:
+        if context is None:
+            context = QuestionContext(document_text, index)
         question_lower = question.lower()
-        text_lower = document_text.lower()
+        facts = context.facts
+        index = context.index
         
         # Find relevant sections based on keywords
         relevant_sections = []
-        sentences = document_text.split('. ')
         
         # Extract keywords from question
         question_keywords = re.findall(r'\b\w+\b', question_lower)
         question_keywords = [word for word in question_keywords if len(word) > 3]
         
-        # Find sentences containing question keywords
-        relevant_sentences = []
-        for sentence in sentences:
-            sentence_lower = sentence.lower()
-            keyword_matches = sum(1 for keyword in question_keywords if keyword in sentence_lower)
-            if keyword_matches > 0:
-                relevant_sentences.append((sentence.strip(), keyword_matches))
-        
-        # Sort by relevance and take top 3
-        relevant_sentences.sort(key=lambda x: x[1], reverse=True)
-        top_sentences = [sent[0] for sent in relevant_sentences[:3]]
+        # Rank sentences by BM25 score against the question keywords and take top 3
+        ranked = index.rank(question_keywords, 3)
+        top_sentences = [index.sentence(sentence_id) for sentence_id, _ in ranked]
         
         # Generate answer based on question type
         if any(word in question_lower for word in ['who', 'party', 'parties']):
-            entities = analyzer.extract_entities(document_text)
-            if entities['parties']:
-                answer = f"The main parties mentioned in the document are: {', '.join(entities['parties'][:3])}."
+            if facts['parties']:
+                answer = f"The main parties mentioned in the document are: {', '.join(facts['parties'][:3])}."
             else:
                 answer = "The specific parties are not clearly identified in the document."
             relevant_sections = ["Parties section"]
         
         elif any(word in question_lower for word in ['when', 'date', 'time']):
-            entities = analyzer.extract_entities(document_text)
-            if entities['dates']:
-                answer = f"Important dates mentioned include: {', '.join(entities['dates'][:3])}."
+            if facts['dates']:
+                answer = f"Important dates mentioned include: {', '.join(facts['dates'][:3])}."
             else:
                 answer = "No specific dates are clearly mentioned in the document."
             relevant_sections = ["Dates and timeline"]
         
         elif any(word in question_lower for word in ['how much', 'cost', 'price', 'amount', 'payment']):
-            entities = analyzer.extract_entities(document_text)
-            if entities['amounts']:
-                answer = f"Financial amounts mentioned include: {', '.join(entities['amounts'][:3])}."
+            if facts['amounts']:
+                answer = f"Financial amounts mentioned include: {', '.join(facts['amounts'][:3])}."
             else:
                 answer = "No specific financial amounts are clearly mentioned in the document."
             relevant_sections = ["Payment terms"]
         
         elif any(word in question_lower for word in ['termination', 'end', 'cancel']):
-            if 'termination' in text_lower:
+            headed = find_clauses(facts, 'termination')
+            if headed:
+                answer = "The document contains termination provisions. " + clause_excerpt(document_text, headed[0])
+                relevant_sections = [node["title"] for node in headed[:3]]
+            elif facts['clauses']['termination']:
                 answer = "The document contains termination provisions. " + (top_sentences[0] if top_sentences else "Please review the termination section for specific details.")
+                relevant_sections = ["Termination clause"]
             else:
                 answer = "Termination provisions are not explicitly mentioned in this document."
-            relevant_sections = ["Termination clause"]
+                relevant_sections = ["Termination clause"]
         
         elif any(word in question_lower for word in ['liability', 'responsible', 'liable']):
-            if 'liability' in text_lower:
+            headed = find_clauses(facts, 'liability')
+            if headed:
+                answer = "The document contains liability provisions. " + clause_excerpt(document_text, headed[0])
+                relevant_sections = [node["title"] for node in headed[:3]]
+            elif facts['clauses']['liability']:
                 answer = "The document contains liability provisions. " + (top_sentences[0] if top_sentences else "Please review the liability section for specific details.")
+                relevant_sections = ["Liability section"]
             else:
                 answer = "Liability provisions are not explicitly mentioned in this document."
-            relevant_sections = ["Liability section"]
+                relevant_sections = ["Liability section"]
         
         else:
             # General question - return most relevant content
@@ -443,7 +2557,9 @@ def answer_question(question: str, document_text: str) -> Dict:
                     answer += f" Additionally, {top_sentences[1]}"
             else:
                 answer = "I couldn't find specific information related to your question in the document. Please try rephrasing your question or ask about specific topics like parties, dates, payments, or termination."
-            relevant_sections = ["General content"]
+            # Name the clause the best sentence sits in when the document has headed clauses
+            clause = clause_at(facts, index.span(ranked[0][0])[0]) if ranked else None
+            relevant_sections = [clause["title"] if clause else "General content"]
         
         return {
             "answer": answer,
@@ -459,66 +2575,1231 @@ def answer_question(question: str, document_text: str) -> Dict:
             "confidence_score": 0.1
         }
 
-@app.post("/upload", response_model=DocumentResponse)
-async def upload_document(file: UploadFile = File(...)):
-    """Upload and analyze a legal document"""
+# Clause segmentation: headings at the start of a line (Article, Section, Clause, numbered, lettered)
+# nest into a tree of [start, end) spans, built once at upload and stored with the fact sheet
+CLAUSE_HEADING = re.compile(
+    r'^[^\S\n]*(?P<heading>'
+    r'(?i:(?P<kind>part|chapter|schedule|article|section|clause))[^\S\n]+(?P<label>\d{1,3}(?:\.\d{1,3})*|[IVXLCivxlc]{1,7}|[A-Za-z])\b[.:)\-]?'
+    r'|(?P<number>\d{1,3}(?:\.\d{1,3})*)[.)]?(?=[^\S\n]+[A-Z])'
+    r'|\((?P<letter>[a-z]|[ivx]{1,4})\)(?=[^\S\n]+\S)'
+    r')[^\n]*',
+    re.MULTILINE
+)
+CLAUSE_KIND_RANKS = {"part": 0, "chapter": 0, "schedule": 0, "article": 1}
+CLAUSE_ITEM_RANK = 9  # (a), (ii): always nested under the clause before them
+CLAUSE_TITLE_CHARS = 100
+CLAUSE_TREE_MAX_NODES = int(os.getenv("CLAUSE_TREE_MAX_NODES", 5000))
+CLAUSE_EXCERPT_CHARS = int(os.getenv("CLAUSE_EXCERPT_CHARS", 300))
+
+def clause_rank(kind: str, label: str) -> int:
+    """Nesting rank of a heading: lower ranks enclose higher ones; dotted numbers nest by depth"""
+    if kind in CLAUSE_KIND_RANKS:
+        return CLAUSE_KIND_RANKS[kind]
+    if kind == "item":
+        return CLAUSE_ITEM_RANK
+    return 2 + label.count(".") if label[:1].isdigit() else 2
+
+def build_clause_tree(text: str) -> List[Dict]:
+    """Headed clauses in document order, each with its span, parent index (-1 at the top) and depth"""
+    nodes: List[Dict] = []
+    open_nodes: List[Tuple[int, int]] = []  # (rank, node index) from the root down
+    for match in CLAUSE_HEADING.finditer(text):
+        if len(nodes) >= CLAUSE_TREE_MAX_NODES:
+            break
+        if match.group("kind"):
+            kind, label = match.group("kind").lower(), match.group("label")
+        elif match.group("number"):
+            kind, label = "clause", match.group("number")
+        else:
+            kind, label = "item", match.group("letter")
+        rank = clause_rank(kind, label)
+        start = match.start("heading")
+        # A heading closes every open clause of the same or a lower level
+        while open_nodes and open_nodes[-1][0] >= rank:
+            nodes[open_nodes.pop()[1]]["end"] = start
+        # The title is the heading line up to the end of its first sentence
+        line = text[start:match.end()]
+        title = line[:match.end("heading") - start] + line[match.end("heading") - start:].split(". ", 1)[0]
+        nodes.append({
+            "title": title.strip().rstrip(".")[:CLAUSE_TITLE_CHARS],
+            "kind": kind,
+            "number": label,
+            "level": len(open_nodes),
+            "parent": open_nodes[-1][1] if open_nodes else -1,
+            "start": start,
+            "end": len(text)
+        })
+        open_nodes.append((rank, len(nodes) - 1))
+    return nodes
+
+def clause_terms(nodes: List[Dict]) -> Dict[str, List[int]]:
+    """Index from each word of a clause title to the clauses with it, so topic lookups need no scan"""
+    terms: Dict[str, List[int]] = {}
+    for node_id, node in enumerate(nodes):
+        for term in dict.fromkeys(SearchIndex.terms(node["title"])):
+            terms.setdefault(term, []).append(node_id)
+    return terms
+
+def find_clauses(facts: Dict, topic: str) -> List[Dict]:
+    """Clauses whose title mentions every word of topic, outermost first"""
+    nodes = facts.get("clause_tree") or []
+    terms = facts.get("clause_terms") or {}
+    matches = None
+    for term in SearchIndex.terms(topic):
+        ids = set(terms.get(term, ()))
+        matches = ids if matches is None else matches & ids
+    return sorted((nodes[node_id] for node_id in matches or ()), key=lambda node: (node["level"], node["start"]))
+
+def clause_at(facts: Dict, offset: int) -> Optional[Dict]:
+    """The innermost clause containing a text offset, or None"""
+    nodes = facts.get("clause_tree") or []
+    low, high = 0, len(nodes)
+    while low < high:
+        middle = (low + high) // 2
+        if nodes[middle]["start"] <= offset:
+            low = middle + 1
+        else:
+            high = middle
+    node_id = low - 1
+    while node_id >= 0 and nodes[node_id]["end"] <= offset:
+        node_id = nodes[node_id]["parent"]
+    return nodes[node_id] if node_id >= 0 else None
+
+def clause_excerpt(text: Union[str, CompactText], node: Dict, limit: int = CLAUSE_EXCERPT_CHARS) -> str:
+    """Start of a clause's text with whitespace collapsed, cut at a word boundary"""
+    excerpt = " ".join(text[node["start"]:min(node["end"], node["start"] + 4 * limit)].split())
+    if len(excerpt) <= limit:
+        return excerpt
+    return excerpt[:limit].rsplit(" ", 1)[0] + "..."
+
+def nest_clauses(nodes: List[Dict]) -> List[Dict]:
+    """The flat clause list as nested dicts with children"""
+    nested = [{key: value for key, value in node.items() if key != "parent"} | {"children": []} for node in nodes]
+    roots = []
+    for node, copy in zip(nodes, nested):
+        (nested[node["parent"]]["children"] if node["parent"] >= 0 else roots).append(copy)
+    return roots
+
+class ClauseTable(Sequence):
+    """A stored clause tree as columns: offsets, depths and parents in arrays, titles in lists.
+
+    Indexing returns the node dict build_clause_tree made, so the clause helpers
+    work on either form.
+    """
+
+    FIELDS = ("title", "kind", "number", "level", "parent", "start", "end")
+
+    def __init__(self, nodes: Iterable[Dict]):
+        self.titles, self.kinds, self.numbers = [], [], []
+        self.levels, self.parents, self.starts, self.ends = array('B'), array('i'), array('I'), array('I')
+        for node in nodes:
+            self.titles.append(node["title"])
+            self.kinds.append(node["kind"])
+            self.numbers.append(node["number"])
+            self.levels.append(min(node["level"], 255))
+            self.parents.append(node["parent"])
+            self.starts.append(node["start"])
+            self.ends.append(node["end"])
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, node_id):
+        if isinstance(node_id, slice):
+            return [self[i] for i in range(*node_id.indices(len(self)))]
+        columns = (self.titles, self.kinds, self.numbers, self.levels, self.parents, self.starts, self.ends)
+        return dict(zip(self.FIELDS, (column[node_id] for column in columns)))
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sum(
+            deep_sizeof(column) for column in (self.titles, self.kinds, self.numbers, self.levels, self.parents, self.starts, self.ends))
+
+FACT_SHEET_TOPICS = ('termination', 'liability')
+FACT_SHEET_MAX_CLAUSES = 20
+
+def stored_facts(document_id: str, document: Dict) -> Dict:
+    """The stored document's fact sheet, built and written back to the store if it has none yet.
+
+    Documents uploaded before fact sheets or clause trees existed pay for the
+    scan once rather than on every question. Blocking, so called from a worker thread.
+    """
+    facts = document.get("facts")
+    if facts is None or "clause_tree" not in facts:
+        text = str(document["text"])
+        facts = build_fact_sheet(text, analyzer.scan(text))
+        documents_store.put_facts(document_id, facts)
+    return facts
+
+def build_fact_sheet(text: str, features: DocumentFeatures, clause_tree: Optional[List[Dict]] = None) -> Dict:
+    """Facts the common question types are answered from, gathered once at upload"""
+    entities = analyzer.extract_entities(features)
+    if clause_tree is None:
+        clause_tree = build_clause_tree(text)
+    facts = {"clause_tree": clause_tree, "clause_terms": clause_terms(clause_tree)}
+    separator = SentenceIndex.SEPARATOR
+    clauses = {topic: [] for topic in FACT_SHEET_TOPICS}
+    # A topic with clauses titled after it uses their spans; the others fall back to sentences mentioning it
+    for topic in FACT_SHEET_TOPICS:
+        for node in find_clauses(facts, topic):
+            # Outermost come first, so a clause nested in one already taken is covered by it
+            if len(clauses[topic]) < FACT_SHEET_MAX_CLAUSES and not any(start <= node["start"] < end for start, end in clauses[topic]):
+                clauses[topic].append([node["start"], node["end"]])
+    sentence_topics = [topic for topic in FACT_SHEET_TOPICS if not clauses[topic]]
+    resume = dict.fromkeys(FACT_SHEET_TOPICS, 0)
+    reach = max(map(len, FACT_SHEET_TOPICS)) - 1
+    # Case-fold one window at a time; a window also takes the few characters a match may run past it
+    for window_start in range(0, len(text) if sentence_topics else 0, SCAN_WINDOW_CHARS):
+        folded = fold_case(text[window_start:window_start + SCAN_WINDOW_CHARS + reach])
+        for topic in sentence_topics:
+            # [start, end) of each sentence mentioning the topic, using the sentence index's '. ' boundaries
+            spans = clauses[topic]
+            position = folded.find(topic, max(resume[topic] - window_start, 0))
+            while 0 <= position < SCAN_WINDOW_CHARS and len(spans) < FACT_SHEET_MAX_CLAUSES:
+                position += window_start
+                start = text.rfind(separator, 0, position)
+                start = 0 if start < 0 else start + len(separator)
+                end = text.find(separator, position)
+                end = len(text) if end < 0 else end
+                spans.append([start, end])
+                resume[topic] = end
+                position = folded.find(topic, end - window_start) if end - window_start < len(folded) else -1
+    return {
+        "parties": entities["parties"],
+        "dates": entities["dates"],
+        "amounts": entities["amounts"],
+        "clauses": clauses,
+        **facts
+    }
+
+# Incremental re-analysis: documents are cut into paragraphs that no match can span, so the findings
+# of a paragraph depend only on its own text and carry over to the next version of the document
+PARAGRAPH_BREAK = re.compile(r'\n\s*')
+# Runs of lines without a blank line are also cut after lines whose CRC-32 is a multiple of this
+PARAGRAPH_LINE_SPLIT = int(os.getenv("PARAGRAPH_LINE_SPLIT", 8))
+# Larger documents are scanned in one streaming pass and keep no paragraph findings; 0 disables
+INCREMENTAL_MAX_CHARS = int(os.getenv("INCREMENTAL_MAX_CHARS", 8 * 1024 * 1024))
+SECTION_WORDS = ("section", "article", "clause")
+
+def paragraph_break_is_safe(text: str, position: int) -> bool:
+    """Whether no pattern can match across the whitespace run (with a newline) that starts at position"""
+    last = text[position - 1]
+    if last.isalnum() or last == '_':
+        # Multi-word keywords, headings, dates and party names can all continue across whitespace
+        return False
+    if last in ':.-':
+        # "Section 5." takes its title from the next line
+        digits_end = position - 2
+        i = digits_end
+        while i >= 0 and text[i].isdecimal():
+            i -= 1
+        if i == digits_end:
+            return True
+        j = i
+        while j >= 0 and text[j].isspace():
+            j -= 1
+        return j == i or not fold_case(text[max(0, j - 6):j + 1]).endswith(SECTION_WORDS)
+    return True
+
+def paragraph_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of each paragraph; a paragraph includes the whitespace that follows it"""
+    spans = []
+    start = line_start = 0
+    for match in PARAGRAPH_BREAK.finditer(text):
+        position, end = match.span()
+        # The whitespace before the newline is walked back by hand: a leading \s* in the
+        # pattern would be retried from every character of a long run without a newline
+        while position > line_start and text[position - 1].isspace():
+            position -= 1
+        line_tail = text[max(line_start, position - 32):position]
+        line_start = end
+        if position == 0 or end == len(text):
+            continue
+        # Cut at blank lines, and at single line breaks chosen by content so cuts survive edits elsewhere
+        if text.count('\n', position, end) < 2 and (
+                PARAGRAPH_LINE_SPLIT <= 0 or zlib.crc32(line_tail.encode("utf-8", "surrogatepass")) % PARAGRAPH_LINE_SPLIT):
+            continue
+        if paragraph_break_is_safe(text, position):
+            spans.append((start, end))
+            start = end
+    spans.append((start, len(text)))
+    return spans
+
+def paragraph_key(paragraph: str) -> str:
+    return hashlib.blake2b(paragraph.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+def scan_paragraphs(text: str, previous: Optional[List[list]] = None) -> Tuple[DocumentFeatures, List[list], Dict]:
+    """Scan a document paragraph by paragraph, reusing the findings recorded for an earlier version.
+
+    Paragraph findings are stored as [hash, *ScanFindings fields] records. Returns the
+    features (identical to a full scan), the records for this document and a reuse report.
+    """
+    scanner = analyzer.scanner
+    known = {record[0]: record for record in previous or ()}
+    spans = paragraph_spans(text)
+    records: Dict[str, list] = {}
+    pieces = []
+    reused = reused_chars = 0
+    for start, end in spans:
+        paragraph = text[start:end]
+        key = paragraph_key(paragraph)
+        record = records.get(key) or known.get(key)
+        if record is not None:
+            found = ScanFindings(*record[1:])
+            reused += 1
+            reused_chars += end - start
+        else:
+            found = scanner.collect(text_windows(paragraph, SCAN_WINDOW_CHARS))
+            record = [key, *vars(found).values()]
+        records[key] = record
+        pieces.append((start, found))
+
+    def rescan(i: int) -> ScanFindings:
+        start, end = spans[i]
+        return scanner.collect(text_windows(text[start:end], SCAN_WINDOW_CHARS), party_limit=None)
+
+    features = scanner.merge(pieces, rescan)
+    return features, list(records.values()), {
+        "paragraphs": len(spans),
+        "reused_paragraphs": reused,
+        "rescanned_paragraphs": len(spans) - reused,
+        "reused_characters": reused_chars,
+        "reused_fraction": round(reused_chars / len(text), 4) if text else 0.0
+    }
+
+# Clause diff between two stored documents. Clauses are cut before every clause heading and after
+# every blank line; they are aligned with a patience diff over their hashes, and unmatched ones
+# paired by shared word shingles.
+DIFF_BLANK_LINE = re.compile(r'\n[^\S\n]*\n\s*')
+DIFF_SIMILARITY = float(os.getenv("DIFF_SIMILARITY", 0.5))
+DIFF_SNIPPET_CHARS = int(os.getenv("DIFF_SNIPPET_CHARS", 400))
+# Gaps without unique clauses in common fall back to an exact LCS up to this many cells
+DIFF_LCS_MAX_CELLS = 10000
+SHINGLE_WORDS = 4
+DIFF_COMMON_SHINGLE_OWNERS = 8
+SHINGLE_BASE = 1000003
+SHINGLE_MODULUS = (1 << 61) - 1
+
+def longest_increasing_pairs(pairs: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Longest subsequence of (i, j) pairs, given in increasing j, whose i also increase"""
+    tails: List[int] = []  # tails[k]: index in pairs of the smallest last i of a run of length k + 1
+    previous = [-1] * len(pairs)
+    for index, (i, _) in enumerate(pairs):
+        low, high = 0, len(tails)
+        while low < high:
+            middle = (low + high) // 2
+            if pairs[tails[middle]][0] < i:
+                low = middle + 1
+            else:
+                high = middle
+        previous[index] = tails[low - 1] if low else -1
+        if low == len(tails):
+            tails.append(index)
+        else:
+            tails[low] = index
+    run = []
+    index = tails[-1] if tails else -1
+    while index >= 0:
+        run.append(pairs[index])
+        index = previous[index]
+    return run[::-1]
+
+def lcs_pairs(a: List[int], b: List[int], a0: int, a1: int, b0: int, b1: int) -> List[Tuple[int, int]]:
+    """Matched pairs of an exact longest common subsequence of a[a0:a1] and b[b0:b1]"""
+    rows, cols = a1 - a0, b1 - b0
+    lengths = [[0] * (cols + 1) for _ in range(rows + 1)]
+    for i in range(rows - 1, -1, -1):
+        row, below = lengths[i], lengths[i + 1]
+        for j in range(cols - 1, -1, -1):
+            row[j] = below[j + 1] + 1 if a[a0 + i] == b[b0 + j] else max(below[j], row[j + 1])
+    pairs = []
+    i = j = 0
+    while i < rows and j < cols:
+        if a[a0 + i] == b[b0 + j]:
+            pairs.append((a0 + i, b0 + j))
+            i += 1
+            j += 1
+        elif lengths[i + 1][j] >= lengths[i][j + 1]:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+def align_sequences(a: List[int], b: List[int]) -> List[Tuple[int, int]]:
+    """Patience diff: matched (i, j) index pairs of a and b, in order"""
+    matches = []
+    ranges = [(0, len(a), 0, len(b))]
+    while ranges:
+        a0, a1, b0, b1 = ranges.pop()
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            matches.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            matches.append((a1, b1))
+        if a0 == a1 or b0 == b1:
+            continue
+        # Anchor on items that occur exactly once on both sides, then recurse between anchors
+        counts_a = Counter(a[a0:a1])
+        counts_b = Counter(b[b0:b1])
+        unique_a = {a[i]: i for i in range(a0, a1) if counts_a[a[i]] == 1}
+        anchors = longest_increasing_pairs([
+            (unique_a[b[j]], j) for j in range(b0, b1) if counts_b[b[j]] == 1 and b[j] in unique_a
+        ])
+        if not anchors:
+            if (a1 - a0) * (b1 - b0) <= DIFF_LCS_MAX_CELLS:
+                matches.extend(lcs_pairs(a, b, a0, a1, b0, b1))
+            continue
+        previous_i, previous_j = a0, b0
+        for i, j in anchors:
+            matches.append((i, j))
+            ranges.append((previous_i, i, previous_j, j))
+            previous_i, previous_j = i + 1, j + 1
+        ranges.append((previous_i, a1, previous_j, b1))
+    matches.sort()
+    return matches
+
+def word_shingles(text: str) -> set:
+    """Rolling (Rabin-Karp) hashes of every run of SHINGLE_WORDS consecutive words"""
+    words = [hash(word) for word in KeywordAutomaton.TOKEN.findall(fold_case(text))]
+    if len(words) < SHINGLE_WORDS:
+        return {hash(tuple(words))} if words else set()
+    top = pow(SHINGLE_BASE, SHINGLE_WORDS - 1, SHINGLE_MODULUS)
+    shingles = set()
+    rolling = 0
+    for position, word in enumerate(words):
+        if position >= SHINGLE_WORDS:
+            rolling = (rolling - words[position - SHINGLE_WORDS] * top) % SHINGLE_MODULUS
+        rolling = (rolling * SHINGLE_BASE + word) % SHINGLE_MODULUS
+        if position >= SHINGLE_WORDS - 1:
+            shingles.add(rolling)
+    return shingles
+
+def pair_modified(removed: List[int], added: List[int], shingles_a, shingles_b) -> List[Tuple[int, int, float]]:
+    """Pair removed and added clauses of one hunk whose shingle sets are similar enough, best pairs first"""
+    owners: Dict[int, List[int]] = {}
+    for i in removed:
+        for shingle in shingles_a(i):
+            owners.setdefault(shingle, []).append(i)
+    # Candidates share a distinctive shingle; boilerplate shared by many clauses would pair everything
+    owners = {shingle: clauses for shingle, clauses in owners.items() if len(clauses) <= DIFF_COMMON_SHINGLE_OWNERS}
+    candidates = []
+    for j in added:
+        new = shingles_b(j)
+        for i in {i for shingle in new for i in owners.get(shingle, ())}:
+            old = shingles_a(i)
+            if min(len(old), len(new)) < DIFF_SIMILARITY * max(len(old), len(new)):
+                continue
+            shared = len(old & new)
+            similarity = shared / (len(old) + len(new) - shared)
+            if similarity >= DIFF_SIMILARITY:
+                candidates.append((similarity, i, j))
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1], candidate[2]))
+    pairs, used_a, used_b = [], set(), set()
+    for similarity, i, j in candidates:
+        if i not in used_a and j not in used_b:
+            used_a.add(i)
+            used_b.add(j)
+            pairs.append((i, j, similarity))
+    return sorted(pairs, key=lambda pair: pair[1])
+
+def diff_clause_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) of each clause the diff compares; whitespace between clauses ends the one before.
+
+    Unlike the scan paragraphs, these boundaries do not depend on line hashes or on
+    how a line ends, so editing one clause leaves the boundaries of the others alone.
+    """
+    cuts = {0, len(text)}
+    cuts.update(match.start("heading") for match in CLAUSE_HEADING.finditer(text))
+    cuts.update(match.end() for match in DIFF_BLANK_LINE.finditer(text))
+    cuts = sorted(cuts)
+    return [(start, end) for start, end in zip(cuts, cuts[1:]) if not text[start:end].isspace()]
+
+def keyword_pattern(keyword: str) -> str:
+    """Regular expression matching a keyword the way KeywordAutomaton does, on lower-cased text"""
+    parts = KeywordAutomaton.SEPARATOR.split(keyword.lower())
+    first = re.escape(parts[0])
+    rest = "".join(('-' if separator == '-' else r'\s+') + re.escape(word) for separator, word in zip(parts[1::2], parts[2::2]))
+    # The word-start check follows the first word, so the pattern begins with a literal the engine can skip to
+    return rf'{first}(?<![^\W_]{first}){rest}(?![^\W_])'
+
+RISK_INDICATOR_PATTERN = re.compile("|".join(keyword_pattern(keyword) for keyword in analyzer.risk_indicators))
+WHITESPACE_RUN = re.compile(r'\s+')
+
+def risk_indicators_in(folded: str) -> set:
+    """The risk indicators occurring in lower-cased text, found in one pass"""
+    return {WHITESPACE_RUN.sub(" ", match.group()) for match in RISK_INDICATOR_PATTERN.finditer(folded)}
+
+def diff_documents(document_a: Dict, document_b: Dict) -> Dict:
+    """Clauses added, removed and modified from document_a to document_b, and how risk indicators changed"""
+    text_a, text_b = str(document_a["text"]), str(document_b["text"])
+    spans_a, spans_b = diff_clause_spans(text_a), diff_clause_spans(text_b)
+
+    # Clauses compare equal when their words are equal, whatever the whitespace
+    ids: Dict[str, int] = {}
+    keys_a = [ids.setdefault(" ".join(text_a[start:end].split()), len(ids)) for start, end in spans_a]
+    keys_b = [ids.setdefault(" ".join(text_b[start:end].split()), len(ids)) for start, end in spans_b]
+    matches = align_sequences(keys_a, keys_b)
+
+    cache_a: Dict[int, set] = {}
+    cache_b: Dict[int, set] = {}
+    def shingles_a(i):
+        if i not in cache_a:
+            cache_a[i] = word_shingles(text_a[spans_a[i][0]:spans_a[i][1]])
+        return cache_a[i]
+    def shingles_b(j):
+        if j not in cache_b:
+            cache_b[j] = word_shingles(text_b[spans_b[j][0]:spans_b[j][1]])
+        return cache_b[j]
+
+    risk_delta: Counter = Counter()
+    def clause(text, spans, index, sign):
+        start, end = spans[index]
+        clause_text = text[start:end]
+        risks = Counter(WHITESPACE_RUN.sub(" ", match.group()) for match in RISK_INDICATOR_PATTERN.finditer(fold_case(clause_text)))
+        for keyword, count in risks.items():
+            risk_delta[keyword] += sign * count
+        stripped = clause_text.strip()
+        return {
+            "index": index,
+            "start": start,
+            "end": end,
+            "text": stripped[:DIFF_SNIPPET_CHARS],
+            "risk_indicators": sorted(risks)
+        }
+
+    added, removed, modified = [], [], []
+    unchanged = len(matches)
+    previous_i = previous_j = -1
+    for i, j in matches + [(len(spans_a), len(spans_b))]:
+        gap_a = list(range(previous_i + 1, i))
+        gap_b = list(range(previous_j + 1, j))
+        previous_i, previous_j = i, j
+        if not gap_a and not gap_b:
+            continue
+        paired_a, paired_b = set(), set()
+        for old, new, similarity in pair_modified(gap_a, gap_b, shingles_a, shingles_b) if gap_a and gap_b else ():
+            paired_a.add(old)
+            paired_b.add(new)
+            if keys_a[old] == keys_b[new]:
+                # A repeated clause the alignment left unmatched
+                unchanged += 1
+                continue
+            modified.append({
+                "before": clause(text_a, spans_a, old, -1),
+                "after": clause(text_b, spans_b, new, 1),
+                "similarity": round(similarity, 4)
+            })
+        removed.extend(clause(text_a, spans_a, old, -1) for old in gap_a if old not in paired_a)
+        added.extend(clause(text_b, spans_b, new, 1) for new in gap_b if new not in paired_b)
+
+    # Clauses outside the changes are identical, so the changes alone give the net count of each indicator
+    indicator_changes = []
+    found_a = risk_indicators_in(fold_case(text_a)) if risk_delta else set()
+    found_b = risk_indicators_in(fold_case(text_b)) if risk_delta else set()
+    for keyword in analyzer.risk_indicators:
+        if keyword not in risk_delta:
+            continue
+        delta = risk_delta[keyword]
+        present_a = keyword in found_a
+        present_b = keyword in found_b
+        if present_b and not present_a:
+            status = "introduced"
+        elif present_a and not present_b:
+            status = "eliminated"
+        elif delta:
+            status = "increased" if delta > 0 else "decreased"
+        else:
+            continue
+        indicator_changes.append({"indicator": keyword, "status": status, "occurrences_delta": delta})
+
+    return {
+        "clauses": {
+            "before": len(spans_a),
+            "after": len(spans_b),
+            "unchanged": unchanged,
+            "added": len(added),
+            "removed": len(removed),
+            "modified": len(modified)
+        },
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+        "risk": {
+            "before": document_a["analysis"].get("risk_assessment"),
+            "after": document_b["analysis"].get("risk_assessment"),
+            "indicator_changes": indicator_changes
+        }
+    }
+
+def analyze_upload(text: str, previous_paragraphs: Optional[List[list]] = None) -> Dict:
+    """Analysis and fact sheet for an upload; the second stage run by the analysis executor.
+
+    The scan goes paragraph by paragraph so the findings can be stored and reused
+    when a new version of the document is uploaded with previous_document_id.
+    """
+    if INCREMENTAL_MAX_CHARS <= 0 or len(text) > INCREMENTAL_MAX_CHARS:
+        features, paragraphs, reuse = analyzer.scan(text), None, None
+    else:
+        features, paragraphs, reuse = scan_paragraphs(text, previous_paragraphs)
+    clause_tree = build_clause_tree(text)
+    return {
+        # Cached and stored as one UTF-8 buffer; the sentence index only keeps offsets into it
+        "text": CompactText(text),
+        "analysis": analyze_document(text, features, clause_tree),
+        "facts": build_fact_sheet(text, features, clause_tree),
+        # Packed here so the cached result holds the same blob the store keeps, and is sized by it
+        "paragraphs": pack_paragraphs(paragraphs) if paragraphs is not None else None,
+        "reuse": reuse
+    }
+
+class ProcessingError(Exception):
+    """Picklable stand-in for an HTTPException raised while processing an upload"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def extract_document(source: Union[bytes, str], extension: str) -> Dict:
+    """Extract text from an uploaded file; this is the first stage run by the analysis executor"""
     try:
-        # Validate file type
-        if not file.filename.lower().endswith(('.pdf', '.docx', '.txt')):
-            raise HTTPException(status_code=400, detail="Only PDF, DOCX, and TXT files are supported")
-        
-        # Read file content
-        file_content = await file.read()
-        
         # Extract text based on file type
-        if file.filename.lower().endswith('.pdf'):
-            text = extract_text_from_pdf(file_content)
-        elif file.filename.lower().endswith('.docx'):
-            text = extract_text_from_docx(file_content)
+        page_offsets = [0]
+        encoding = None
+        if extension == '.pdf':
+            text, page_offsets = extract_pdf_pages(source)
+        elif extension == '.docx':
+            text = extract_text_from_docx(source)
         else:  # .txt
-            text = extract_text_from_txt(file_content)
+            text, encoding = extract_txt(source)
         
         if not text.strip():
             raise HTTPException(status_code=400, detail="No text content found in the document")
         
-        # Generate unique document ID
-        document_id = str(uuid.uuid4())
-        
-        # Analyze document
-        analysis = analyze_document(text)
+        return {"text": text, "page_offsets": page_offsets, "encoding": encoding}
+    except HTTPException as e:
+        # HTTPException cannot be pickled back from a worker process
+        raise ProcessingError(e.status_code, e.detail)
+
+def warm_worker():
+    """Pool initializer: load the parsers and compiled patterns before the first task"""
+    import PyPDF2  # noqa: F401
+    analyzer.scan("")
+
+class AnalysisExecutor:
+    """Runs CPU-bound document processing off the event loop.
+
+    Modes: "inline" runs on the event loop (the old behaviour), "thread" uses a
+    thread pool and "process" a pool of pre-warmed worker processes. At most
+    ``workers + queue_depth`` tasks are admitted at once; further uploads get a
+    503. A task that exceeds ``timeout`` seconds gets a 504, and in process mode
+    the pool is recycled so the stuck worker is killed. A thread cannot be
+    killed, so in thread mode a timed-out task keeps its slot until it finishes.
+    """
+
+    MODES = ("inline", "thread", "process")
+
+    def __init__(self, mode: str, workers: int, queue_depth: int, timeout: float):
+        if mode not in self.MODES:
+            raise ValueError(f"ANALYSIS_EXECUTION_MODE must be one of {', '.join(self.MODES)}, got {mode!r}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self.timeout = timeout
+        self.executor = None
+        self.in_flight = 0
+        self.stuck = 0  # timed-out tasks still running, counted in in_flight
+        self.rejected = 0
+        self.timed_out = 0
+        self.recycled = 0
+
+    def _create_pool(self):
+        if self.mode == "process":
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+            # Start every worker now rather than on the first uploads
+            for future in [pool.submit(int) for _ in range(self.workers)]:
+                future.result()
+            return pool
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+
+    def start(self):
+        if self.mode != "inline" and self.executor is None:
+            self.executor = self._create_pool()
+            logger.info(f"Analysis executor started: {self.mode} mode, {self.workers} workers")
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _recycle(self):
+        """Replace the process pool, killing workers that are still busy"""
+        old = self.executor
+        self.executor = self._create_pool()
+        self.recycled += 1
+        # ProcessPoolExecutor has no public way to stop a running task
+        for process in list(getattr(old, "_processes", {}).values()):
+            process.terminate()
+        old.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, func, *args):
+        """Run func(*args) according to the execution mode"""
+        if self.in_flight >= self.workers + self.queue_depth:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy processing other documents, please retry shortly")
         
-        # Store document
-        documents_store[document_id] = {
-            "id": document_id,
-            "filename": file.filename,
-            "text": text,
-            "analysis": analysis,
-            "upload_time": datetime.now().isoformat()
+        self.in_flight += 1
+        future = None
+        try:
+            if self.mode == "inline":
+                return func(*args)
+            self.start()
+            executor = self.executor
+            loop = asyncio.get_running_loop()
+            future = executor.submit(func, *args)
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except ProcessingError as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.error(f"Document processing timed out after {self.timeout}s")
+            if self.mode == "process" and self.executor is executor:
+                self._recycle()
+            raise HTTPException(status_code=504, detail="Document processing timed out")
+        except BrokenProcessPool:
+            logger.error("Analysis worker process died; recycling the pool")
+            if self.executor is executor:
+                self._recycle()
+            raise HTTPException(status_code=503, detail="Document processing failed, please retry")
+        finally:
+            if future is not None and not future.done():
+                # Still running after a timeout: release the slot only when the work really ends
+                self.stuck += 1
+                future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release_stuck))
+            else:
+                self.in_flight -= 1
+
+    def _release_stuck(self):
+        self.stuck -= 1
+        self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "stuck": self.stuck,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "recycled": self.recycled
         }
+
+analysis_executor = AnalysisExecutor(
+    mode=os.getenv("ANALYSIS_EXECUTION_MODE", "thread"),
+    workers=int(os.getenv("ANALYSIS_WORKERS", os.cpu_count() or 2)),
+    queue_depth=int(os.getenv("ANALYSIS_QUEUE_DEPTH", 16)),
+    timeout=float(os.getenv("ANALYSIS_TASK_TIMEOUT", 120))
+)
+
+# Background upload jobs, for documents that take longer than a gateway timeout
+class JobScheduler:
+    """Bounded in-process scheduler for background upload jobs.
+
+    At most ``concurrency`` jobs run at once; up to ``backlog`` more wait in a
+    FIFO queue and anything beyond that is refused with a 503. Job state is
+    written to the document store as it changes, so any worker sharing the
+    store can answer a poll. Finished jobs stay queryable for ``ttl`` seconds.
+    """
+
+    def __init__(self, store: DocumentStore, concurrency: int, backlog: int, ttl: float):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.backlog = max(1, backlog)
+        self.ttl = ttl
+        self.jobs: Dict[str, Dict] = {}  # this worker's queued and running jobs
+        self.queue: Optional[asyncio.Queue] = None
+        self.runners: List[asyncio.Task] = []
+
+    def start(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.backlog)
+            self.runners = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    def stop(self):
+        for runner in self.runners:
+            runner.cancel()
+        self.runners = []
+        self.queue = None
+
+    def _cutoff(self) -> str:
+        return (datetime.now() - timedelta(seconds=self.ttl)).isoformat()
+
+    async def submit(self, filename: str, work, cleanup=None) -> Dict:
+        """Queue work(report) and return the new job; awaiting report(stage, progress) updates it.
+
+        Job state is read and written in worker threads: a shared store can block on its lock.
+        """
+        self.start()
+        await asyncio.to_thread(self.store.expire_jobs, self._cutoff())
+        now = datetime.now().isoformat()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "filename": filename,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0.0,
+            "created_at": now,
+            "updated_at": now,
+            "result": None,
+            "error": None
+        }
+        busy = HTTPException(status_code=503, detail="Too many queued jobs, please retry shortly")
+        if self.queue.full():
+            raise busy
+        # Recorded before it is queued, so this write cannot land after the runner's
+        await asyncio.to_thread(self.store.put_job, dict(job))
+        try:
+            self.queue.put_nowait((job, work, cleanup))
+        except asyncio.QueueFull:
+            # Other submits filled the queue while the job was being recorded
+            job.update(status="failed", error={"status_code": busy.status_code, "detail": busy.detail})
+            await asyncio.to_thread(self.store.put_job, dict(job))
+            raise busy
+        self.jobs[job["job_id"]] = job
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        job = await asyncio.to_thread(self.store.get_job, job_id)
+        if job is None or (job["status"] in JOB_FINISHED and job["updated_at"] < self._cutoff()):
+            return None
+        return job
+
+    async def _run(self):
+        while True:
+            job, work, cleanup = await self.queue.get()
+
+            async def report(stage: str, progress: float, job=job):
+                job.update(stage=stage, progress=progress, updated_at=datetime.now().isoformat())
+                # A snapshot, so a later update cannot change what is being written
+                await asyncio.to_thread(self.store.put_job, dict(job))
+
+            job["status"] = "running"
+            try:
+                await asyncio.to_thread(self.store.put_job, dict(job))
+                response = await work(report)
+                job.update(status="completed", result=response.model_dump())
+                await report("completed", 1.0)
+            except HTTPException as e:
+                job.update(status="failed", error={"status_code": e.status_code, "detail": e.detail})
+                await report("failed", job["progress"])
+            except Exception as e:
+                logger.error(f"Error processing job {job['job_id']}: {e}")
+                job.update(status="failed", error={"status_code": 500, "detail": "Failed to process document"})
+                await report("failed", job["progress"])
+            finally:
+                if cleanup is not None:
+                    cleanup()
+                self.jobs.pop(job["job_id"], None)
+                self.queue.task_done()
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "backlog": self.backlog,
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "jobs": len(self.jobs)
+        }
+
+job_scheduler = JobScheduler(
+    documents_store,
+    concurrency=int(os.getenv("JOB_CONCURRENCY", 2)),
+    backlog=int(os.getenv("JOB_BACKLOG", 100)),
+    ttl=float(os.getenv("JOB_TTL_SECONDS", 3600))
+)
+
+@app.on_event("startup")
+async def start_analysis_executor():
+    global search_sync_task
+    analysis_executor.start()
+    job_scheduler.start()
+    search_sync_task = asyncio.create_task(search_index.run(documents_store))
+
+@app.on_event("shutdown")
+async def stop_analysis_executor():
+    if search_sync_task is not None:
+        search_sync_task.cancel()
+    job_scheduler.stop()
+    analysis_executor.shutdown()
+    if pdf_page_pool is not None:
+        pdf_page_pool.shutdown(wait=False, cancel_futures=True)
+    documents_store.close()
+
+async def ignore_progress(stage: str, progress: float):
+    pass
+
+async def ingest_upload(upload: SpooledUpload, report=None, previous_document_id: Optional[str] = None) -> DocumentResponse:
+    """Extract, analyze and store a received upload; report(stage, progress) tracks the stages.
+
+    With previous_document_id, paragraphs unchanged since that version reuse its findings.
+    """
+    report = report or ignore_progress
+    previous_paragraphs = None
+    if previous_document_id:
+        # Store access can block on a shared store's lock, so it runs in a worker thread
+        if not await asyncio.to_thread(documents_store.__contains__, previous_document_id):
+            raise HTTPException(status_code=404, detail="Previous document not found")
+        previous_paragraphs = await asyncio.to_thread(documents_store.get_paragraphs, previous_document_id) or []
+    cache_key = AnalysisCache.key(upload.content_hash, upload.extension)
+    cached = analysis_cache.get(cache_key)
+    reuse = None
+    
+    if cached is not None:
+        result = cached
+    else:
+        # Extraction and analysis are CPU-bound; keep them off the event loop
+        await report("extracting", 0.1)
+        result = await analysis_executor.run(extract_document, upload.source(), upload.extension)
+        await report("analyzing", 0.5)
+        result.update(await analysis_executor.run(analyze_upload, result["text"], previous_paragraphs))
+        reuse = result.pop("reuse")
+        if reuse is not None and previous_document_id:
+            reuse = {"previous_document_id": previous_document_id, **reuse}
+        else:
+            reuse = None
+        if result["encoding"]:
+            result["analysis"]["encoding"] = result["encoding"]
+        await asyncio.to_thread(analysis_cache.put, cache_key, result)
+    analysis = result["analysis"]
+    
+    # Generate unique document ID
+    await report("storing", 0.9)
+    document_id = str(uuid.uuid4())
+    
+    # Store document
+    await asyncio.to_thread(documents_store.put, {
+        "id": document_id,
+        "filename": upload.filename,
+        "text": result["text"],
+        "page_offsets": result["page_offsets"],
+        "analysis": analysis,
+        "facts": result["facts"],
+        "paragraphs": result.get("paragraphs"),
+        "upload_time": datetime.now().isoformat()
+    })
+    index_in_background(document_id, result["text"])
+    
+    logger.info(f"Successfully analyzed document: {upload.filename} (cache {'hit' if cached is not None else 'miss'})")
+    
+    return DocumentResponse(
+        document_id=document_id,
+        filename=upload.filename,
+        summary=analysis,
+        cache_hit=cached is not None,
+        reuse=reuse
+    )
+
+# The body is parsed by UploadReceiver, so describe the form for the OpenAPI docs by hand
+UPLOAD_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "previous_document_id": {"type": "string", "description": "Earlier version of this document; its unchanged paragraphs are not rescanned"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+@app.post("/upload", response_model=DocumentResponse, openapi_extra=UPLOAD_REQUEST_BODY,
+          responses={202: {"description": "Job accepted (async=true); poll /jobs/{job_id}"}})
+async def upload_document(request: Request, run_async: bool = Query(False, alias="async"),
+                          previous_document_id: Optional[str] = Query(None)):
+    """Upload and analyze a legal document; with ?async=true, return a job to poll instead"""
+    receiver = UploadReceiver(request)
+    handed_off = False
+    try:
+        # Stream the file to a spool while hashing, sniffing and size-checking it
+        uploads, fields = await receiver.receive()
+        if not uploads:
+            raise HTTPException(status_code=400, detail="No file uploaded")
+        upload = uploads[0]
+        previous_document_id = previous_document_id or fields.get("previous_document_id") or None
         
-        logger.info(f"Successfully analyzed document: {file.filename}")
+        if run_async:
+            # The job owns the spooled file from here on and removes it when done
+            job = await job_scheduler.submit(upload.filename, lambda report: ingest_upload(upload, report, previous_document_id), cleanup=upload.close)
+            handed_off = True
+            return JSONResponse(status_code=202, content={
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "status_url": f"/jobs/{job['job_id']}"
+            })
         
-        return DocumentResponse(
-            document_id=document_id,
-            filename=file.filename,
-            summary=analysis
-        )
+        return await ingest_upload(upload, previous_document_id=previous_document_id)
     
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error processing document upload: {e}")
         raise HTTPException(status_code=500, detail="Failed to process document")
+    finally:
+        if not handed_off:
+            receiver.close()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report the stage and progress of an upload job, and its result once finished"""
+    job = await job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+# Batch uploads: many files, or one ZIP archive, in a single request
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 500))
+# Total size of the files in one batch request, so a batch cannot fill the spool disk
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", 1024 * 1024 * 1024))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 0)) or analysis_executor.workers
+# Small in-memory spools per file keep a request of hundreds of files bounded
+BATCH_SPOOL_BYTES = int(os.getenv("BATCH_SPOOL_BYTES", 64 * 1024))
+ARCHIVE_CHUNK_BYTES = 64 * 1024
+
+def spool_archive_member(source: Union[bytes, str], info: zipfile.ZipInfo) -> SpooledUpload:
+    """Decompress one archive member into a SpooledUpload, chunk by chunk.
+
+    Each member opens the archive itself: the batch hands out later members while
+    earlier ones are still being read, so no shared ZipFile can be closed under them.
+    """
+    upload = SpooledUpload(info.filename, spool_bytes=BATCH_SPOOL_BYTES)
+    try:
+        with open_source(source) as fh, zipfile.ZipFile(fh) as archive, archive.open(info) as member:
+            for chunk in iter(lambda: member.read(ARCHIVE_CHUNK_BYTES), b""):
+                upload.write(chunk)
+        upload.finish()
+    except BaseException:
+        upload.close()
+        raise
+    return upload
+
+def iterate_batch(uploads: List[SpooledUpload]):
+    """Yield (filename, opener) per document; opener() is awaited to get its SpooledUpload.
+
+    Archive members are only decompressed when their opener runs, so at most
+    one spool per in-flight document exists at a time.
+    """
+    count = 0
+    for upload in uploads:
+        if upload.extension != '.zip':
+            count += 1
+            yield upload.filename, partial(already_received, upload)
+            continue
+
+        source = upload.source()
+        with open_source(source) as fh, zipfile.ZipFile(fh) as archive:
+            members = archive.infolist()
+        for info in members:
+            if info.is_dir():
+                continue
+            count += 1
+            if count > BATCH_MAX_FILES:
+                yield info.filename, partial(raise_http, 400, f"Batch exceeds {BATCH_MAX_FILES} documents; remaining files were skipped")
+                return
+            if not info.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                yield info.filename, partial(raise_http, 400, unsupported_type_message(SUPPORTED_EXTENSIONS))
+                continue
+            yield info.filename, partial(asyncio.to_thread, spool_archive_member, source, info)
+
+async def already_received(upload: SpooledUpload) -> SpooledUpload:
+    return upload
+
+async def raise_http(status_code: int, detail: str):
+    raise HTTPException(status_code=status_code, detail=detail)
+
+async def process_batch_item(index: int, filename: str, opener) -> Dict:
+    """Run one batch document through the upload path and describe the outcome"""
+    upload = None
+    try:
+        upload = await opener()
+        response = await ingest_upload(upload)
+        return {"index": index, "filename": filename, "status": "ok", **response.model_dump()}
+    except HTTPException as e:
+        return {"index": index, "filename": filename, "status": "error", "status_code": e.status_code, "detail": e.detail}
+    except Exception as e:
+        logger.error(f"Error processing batch document {filename}: {e}")
+        return {"index": index, "filename": filename, "status": "error", "status_code": 500, "detail": "Failed to process document"}
+    finally:
+        if upload is not None:
+            upload.close()
+
+@app.post("/upload/batch", openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": ["files"],
+    "properties": {"files": {"type": "array", "items": {"type": "string", "format": "binary"}}}
+}}}}})
+async def upload_batch(request: Request):
+    """Upload several documents (or one ZIP of them); results stream back as NDJSON as each finishes"""
+    receiver = UploadReceiver(request, max_files=BATCH_MAX_FILES, extensions=SUPPORTED_EXTENSIONS + ('.zip',),
+                              spool_bytes=BATCH_SPOOL_BYTES, max_total_bytes=BATCH_MAX_BYTES)
+    try:
+        uploads, _ = await receiver.receive()
+    except BaseException:
+        receiver.close()
+        raise
+    if not uploads:
+        receiver.close()
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    async def results():
+        items = iterate_batch(uploads)
+        pending = set()
+        index = 0
+        try:
+            while True:
+                # Keep BATCH_CONCURRENCY documents in flight and emit each one as soon as it is done
+                while len(pending) < BATCH_CONCURRENCY:
+                    item = next(items, None)
+                    if item is None:
+                        break
+                    pending.add(asyncio.create_task(process_batch_item(index, *item)))
+                    index += 1
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield json.dumps(task.result()) + "\n"
+        finally:
+            for task in pending:
+                task.cancel()
+            items.close()
+            receiver.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+# Answers to repeated questions; the answer only depends on the document and the question's words
+QUESTION_PUNCTUATION = re.compile(r'[^\w\s]')
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and punctuation folded; punctuation becomes a space so the words stay the same"""
+    return " ".join(QUESTION_PUNCTUATION.sub(" ", fold_case(question)).split())
+
+class AnswerCache:
+    """LRU of answers keyed by (document_id, normalized question), bounded by entry count"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self.questions: Dict[str, set] = {}  # document_id -> normalized questions cached for it
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, document_id: str, question: str) -> Optional[Dict]:
+        answer = self.entries.get((document_id, question))
+        if answer is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end((document_id, question))
+        self.hits += 1
+        return answer
+
+    def put(self, document_id: str, question: str, answer: Dict):
+        if self.max_entries <= 0:
+            return
+        self.entries[(document_id, question)] = answer
+        self.entries.move_to_end((document_id, question))
+        self.questions.setdefault(document_id, set()).add(question)
+        while len(self.entries) > self.max_entries:
+            (evicted_id, evicted_question), _ = self.entries.popitem(last=False)
+            self._forget(evicted_id, evicted_question)
+            self.evictions += 1
+
+    def _forget(self, document_id: str, question: str):
+        questions = self.questions[document_id]
+        questions.discard(question)
+        if not questions:
+            del self.questions[document_id]
+
+    def discard(self, document_id: str):
+        """Drop every answer for a deleted document"""
+        for question in self.questions.pop(document_id, ()):
+            del self.entries[(document_id, question)]
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "documents": len(self.questions),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+answer_cache = AnswerCache(int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 4096)))
+
+def question_state(document_id: str) -> Optional[Tuple[SentenceIndex, Dict]]:
+    """A document's sentence index and fact sheet; None if the document does not exist.
+
+    Served from the sentence index cache when both are there; otherwise the
+    document is read from the store once and both are cached. Blocking, so
+    called from a worker thread.
+    """
+    cached = sentence_indexes.get_with_facts(document_id)
+    if cached is not None:
+        return cached
+    document = documents_store.get(document_id)
+    if document is None:
+        return None
+    index = sentence_indexes.get(document_id, document["text"])
+    facts = stored_facts(document_id, document)
+    sentence_indexes.put(document_id, index, facts)
+    return index, facts
+
+def answer_stored_question(document_id: str, question: str) -> Optional[Dict]:
+    """Answer one question about a stored document; None if the document does not exist.
+
+    The index holds the document text it was built from, so a warm question
+    reads nothing from the store. Blocking, so this runs in a worker thread.
+    """
+    state = question_state(document_id)
+    if state is None:
+        return None
+    index, facts = state
+    context = QuestionContext(index.text, index, facts)
+    return answer_question(question, index.text, context=context)
 
 @app.post("/question", response_model=QuestionResponse)
 async def ask_question(request: QuestionRequest):
     """Ask a question about an uploaded document"""
     try:
-        if request.document_id not in documents_store:
+        question = normalize_question(request.question)
+        # Another worker may have deleted the document since its answers were cached
+        if not await asyncio.to_thread(documents_store.__contains__, request.document_id):
+            answer_cache.discard(request.document_id)
             raise HTTPException(status_code=404, detail="Document not found")
+        response = answer_cache.get(request.document_id, question)
+        if response is not None:
+            return QuestionResponse(**response)
         
-        document = documents_store[request.document_id]
-        response = answer_question(request.question, document["text"])
+        # Answered in normalized form, so a cached answer is exactly what any spelling of the question gets
+        response = await asyncio.to_thread(answer_stored_question, request.document_id, question)
+        if response is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        if response["relevant_sections"] != ["Error handling"]:
+            answer_cache.put(request.document_id, question, response)
         
         return QuestionResponse(**response)
     
@@ -528,33 +3809,175 @@ async def ask_question(request: QuestionRequest):
         logger.error(f"Error processing question: {e}")
         raise HTTPException(status_code=500, detail="Failed to process question")
 
-@app.get("/documents")
-async def list_documents():
-    """List all uploaded documents"""
+QUESTIONS_MAX = int(os.getenv("QUESTIONS_MAX", 100))
+
+def answer_questions(questions: List[str], document_text: Union[str, CompactText], index: SentenceIndex,
+                     facts: Optional[Dict] = None) -> List[Dict]:
+    """Answer a list of questions against one document, sharing its index and fact sheet"""
+    context = QuestionContext(document_text, index, facts)
+    answers = []
+    for question in questions:
+        started = time.perf_counter()
+        answer = answer_question(question, document_text, context=context)
+        answer.update(question=question, elapsed_ms=round((time.perf_counter() - started) * 1000, 3))
+        answers.append(answer)
+    return answers
+
+@app.post("/questions", response_model=QuestionsResponse)
+async def ask_questions(request: QuestionsRequest):
+    """Ask several questions about an uploaded document in one request"""
     try:
-        documents = []
-        for doc_id, doc in documents_store.items():
-            documents.append({
-                "document_id": doc_id,
-                "filename": doc["filename"],
-                "document_type": doc["analysis"]["document_type"],
-                "upload_time": doc["upload_time"]
-            })
+        if not request.questions:
+            raise HTTPException(status_code=400, detail="No questions provided")
+        if len(request.questions) > QUESTIONS_MAX:
+            raise HTTPException(status_code=400, detail=f"At most {QUESTIONS_MAX} questions per request")
+        
+        started = time.perf_counter()
+        # The cached index may outlive a document another worker deleted
+        state = None
+        if await asyncio.to_thread(documents_store.__contains__, request.document_id):
+            state = await asyncio.to_thread(question_state, request.document_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Document not found")
         
-        return {"documents": documents}
+        index, facts = state
+        answers = await asyncio.to_thread(answer_questions, request.questions, index.text, index, facts)
+        
+        return QuestionsResponse(
+            document_id=request.document_id,
+            answers=answers,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 3)
+        )
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing questions: {e}")
+        raise HTTPException(status_code=500, detail="Failed to process questions")
+
+DOCUMENTS_PAGE_SIZE = int(os.getenv("DOCUMENTS_PAGE_SIZE", 100))
+DOCUMENTS_MAX_PAGE_SIZE = 1000
+
+def encode_cursor(summary: Dict) -> str:
+    """Opaque cursor for the page after a document: its (upload_time, id) key"""
+    return base64.urlsafe_b64encode(json.dumps(DocumentListing.key(summary)).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        upload_time, document_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if isinstance(upload_time, str) and isinstance(document_id, str):
+            return upload_time, document_id
+    except (ValueError, TypeError):
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def parse_upload_time(value: Optional[str], name: str) -> Optional[str]:
+    """An ISO date or datetime as the naive local ISO form upload_time is stored in"""
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO 8601 date or datetime")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat()
+
+@app.get("/documents")
+async def list_documents(limit: int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_MAX_PAGE_SIZE),
+                         cursor: Optional[str] = None, document_type: Optional[str] = None,
+                         uploaded_since: Optional[str] = None, uploaded_until: Optional[str] = None,
+                         filename_prefix: Optional[str] = None, order: str = Query("desc", pattern="^(asc|desc)$")):
+    """List uploaded documents newest first, a page at a time; pass next_cursor back for the next page.
+
+    order=asc lists them in upload order instead; a cursor continues in the order it was issued for.
+    uploaded_since is inclusive and uploaded_until exclusive.
+    """
+    try:
+        filters = dict(
+            after=decode_cursor(cursor) if cursor else None,
+            document_type=document_type,
+            since=parse_upload_time(uploaded_since, "uploaded_since"),
+            until=parse_upload_time(uploaded_until, "uploaded_until"),
+            filename_prefix=filename_prefix,
+            descending=order == "desc"
+        )
+        # One extra row tells whether there is a next page
+        documents = await asyncio.to_thread(documents_store.page, limit + 1, **filters)
+        next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+        return {"documents": documents[:limit], "next_cursor": next_cursor}
+    
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing documents: {e}")
         raise HTTPException(status_code=500, detail="Failed to list documents")
 
+@app.get("/documents/stats")
+async def document_store_stats():
+    """Document store size, evictions and hit rate"""
+    return await asyncio.to_thread(documents_store.stats)
+
+@app.get("/documents/{document_id}/diff/{other_id}")
+async def diff_document_versions(document_id: str, other_id: str):
+    """Clauses added, removed and modified from one stored document to another, with risk indicator changes"""
+    try:
+        started = time.perf_counter()
+        document_a = await asyncio.to_thread(documents_store.get, document_id)
+        document_b = await asyncio.to_thread(documents_store.get, other_id)
+        if document_a is None or document_b is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        diff = await asyncio.to_thread(diff_documents, document_a, document_b)
+        return {
+            "document_id": document_id,
+            "other_id": other_id,
+            **diff,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error diffing documents: {e}")
+        raise HTTPException(status_code=500, detail="Failed to diff documents")
+
+@app.get("/documents/{document_id}/clauses")
+async def get_document_clauses(document_id: str, topic: Optional[str] = Query(None, min_length=1)):
+    """The document's clause tree, or with a topic the clauses titled after it with their text"""
+    try:
+        document = await asyncio.to_thread(documents_store.get, document_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        facts = await asyncio.to_thread(stored_facts, document_id, document)
+        
+        if topic is None:
+            return {"document_id": document_id, "count": len(facts["clause_tree"]), "clauses": nest_clauses(facts["clause_tree"])}
+        
+        matches = find_clauses(facts, topic)
+        return {
+            "document_id": document_id,
+            "topic": topic,
+            "clauses": [{**node, "text": clause_excerpt(document["text"], node)} for node in matches]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing clauses: {e}")
+        raise HTTPException(status_code=500, detail="Failed to list clauses")
+
 @app.delete("/documents/{document_id}")
 async def delete_document(document_id: str):
     """Delete a document"""
     try:
-        if document_id not in documents_store:
+        sentence_indexes.discard(document_id)
+        search_index.remove(document_id)
+        answer_cache.discard(document_id)
+        if not await asyncio.to_thread(documents_store.delete, document_id):
             raise HTTPException(status_code=404, detail="Document not found")
         
-        del documents_store[document_id]
         return {"message": "Document deleted successfully"}
     
     except HTTPException:
@@ -563,6 +3986,48 @@ async def delete_document(document_id: str):
         logger.error(f"Error deleting document: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete document")
 
+SEARCH_SNIPPETS = int(os.getenv("SEARCH_SNIPPETS", 3))
+SEARCH_SNIPPET_CHARS = int(os.getenv("SEARCH_SNIPPET_CHARS", 400))
+
+@app.get("/search")
+async def search_documents(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=100)):
+    """Search across all stored documents, returning ranked documents with sentence snippets"""
+    try:
+        terms = SearchIndex.terms(q)
+        
+        results = []
+        for document_id, score in search_index.search(terms, limit):
+            document = await asyncio.to_thread(documents_store.get, document_id)
+            if document is None:
+                search_index.remove(document_id)
+                continue
+            index = await asyncio.to_thread(sentence_indexes.get, document_id, document["text"])
+            snippets = []
+            for sentence_id, sentence_score in index.rank(terms, SEARCH_SNIPPETS):
+                start, end = index.span(sentence_id)
+                end = min(end, start + SEARCH_SNIPPET_CHARS)
+                clause = clause_at(document.get("facts") or {}, start)
+                snippets.append({
+                    "text": document["text"][start:end],
+                    "clause": clause["title"] if clause else None,
+                    "start": start,
+                    "end": end,
+                    "score": round(sentence_score, 4)
+                })
+            results.append({
+                "document_id": document_id,
+                "filename": document["filename"],
+                "document_type": document["analysis"]["document_type"],
+                "score": round(score, 4),
+                "snippets": snippets
+            })
+        
+        return {"query": q, "results": results}
+    
+    except Exception as e:
+        logger.error(f"Error searching documents: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search documents")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -571,6 +4036,12 @@ async def health_check():
         "service": "Legal Document Analyzer",
         "version": "1.0.0",
         "ai_service": "Rule-based Free Analysis",
+        "regex_backend": REGEX_BACKEND,
+        "analysis_cache": analysis_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "analysis_executor": analysis_executor.stats(),
+        "jobs": job_scheduler.stats(),
+        "search_index": search_index.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -583,8 +4054,14 @@ async def root():
         "description": "Free AI-powered legal document analysis and Q&A",
         "endpoints": {
             "upload": "/upload",
+            "batch_upload": "/upload/batch",
+            "jobs": "/jobs/{job_id}",
             "question": "/question",
+            "questions": "/questions",
             "documents": "/documents",
+            "clauses": "/documents/{document_id}/clauses?topic=",
+            "diff": "/documents/{document_id}/diff/{other_id}",
+            "search": "/search?q=",
             "health": "/health"
         }
     }
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Keep test runs away from the SQLite file the app uses by default
+os.environ.setdefault("DOCUMENT_STORE", "memory")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
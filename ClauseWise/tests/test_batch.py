@@ -0,0 +1,61 @@
+import io
+import json
+import zipfile
+
+from fastapi.testclient import TestClient
+
+import main
+
+CONTRACTS = {
+    "lease.txt": "This Lease Agreement is between Acme LLC and Beta Inc. Rent is $1,200 per month.",
+    "services.txt": "This Service Agreement is between Gamma Corp and Delta LLC. Either party may terminate on notice.",
+    "nda.txt": "This Non-Disclosure Agreement keeps confidential information private for two years.",
+}
+
+
+def zip_of(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, text in files.items():
+            archive.writestr(name, text)
+    return buffer.getvalue()
+
+
+def post_batch(client: TestClient, files: list) -> list:
+    response = client.post("/upload/batch", files=[("files", file) for file in files])
+    assert response.status_code == 200
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_zip_members_are_processed_concurrently(monkeypatch):
+    monkeypatch.setattr(main, "documents_store", main.MemoryDocumentStore())
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", 8)
+    results = post_batch(TestClient(main.app), [("contracts.zip", zip_of(CONTRACTS), "application/zip")])
+    assert sorted(result["filename"] for result in results) == sorted(CONTRACTS)
+    assert [result["status"] for result in results] == ["ok"] * len(CONTRACTS)
+
+
+def test_zip_beside_plain_files_with_an_unsupported_member(monkeypatch):
+    monkeypatch.setattr(main, "documents_store", main.MemoryDocumentStore())
+    monkeypatch.setattr(main, "BATCH_CONCURRENCY", 2)
+    archive = zip_of({"nda.txt": CONTRACTS["nda.txt"], "notes.csv": "a,b"})
+    results = post_batch(TestClient(main.app), [
+        ("lease.txt", CONTRACTS["lease.txt"].encode(), "text/plain"),
+        ("more.zip", archive, "application/zip"),
+    ])
+    statuses = {result["filename"]: result["status"] for result in results}
+    assert statuses == {"lease.txt": "ok", "nda.txt": "ok", "notes.csv": "error"}
+
+
+def test_batch_total_size_is_limited(monkeypatch):
+    monkeypatch.setattr(main, "documents_store", main.MemoryDocumentStore())
+    monkeypatch.setattr(main, "BATCH_MAX_BYTES", 150)
+    client = TestClient(main.app)
+    files = [("files", (name, text.encode(), "text/plain")) for name, text in CONTRACTS.items()]
+    # Each file fits on its own; together they pass the limit while the body is read
+    response = client.post("/upload/batch", files=files)
+    assert response.status_code == 413
+    # A declared length over the limit is refused before reading the body
+    response = client.post("/upload/batch", content=b"x" * 70000,
+                           headers={"content-type": "multipart/form-data; boundary=b", "content-length": "70000"})
+    assert response.status_code == 413
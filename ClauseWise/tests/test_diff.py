@@ -0,0 +1,67 @@
+import random
+
+import main
+
+CONTRACT = (
+    "1. The parties are Acme LLC and Beta Inc.\n"
+    "2. The term is one year.\n"
+    "3. Fees are due monthly by wire transfer.\n"
+    "4. Either party may terminate on notice.\n"
+)
+
+
+def diff(before: str, after: str) -> dict:
+    return main.diff_documents({"text": before, "analysis": {}}, {"text": after, "analysis": {}})
+
+
+def test_editing_one_clause_leaves_the_others_unchanged():
+    result = diff(CONTRACT, CONTRACT.replace("one year.", "one year, renewable."))
+    assert result["clauses"] == {"before": 4, "after": 4, "unchanged": 3, "added": 0, "removed": 0, "modified": 1}
+    assert result["modified"][0]["before"]["text"] == "2. The term is one year."
+    assert result["modified"][0]["after"]["text"] == "2. The term is one year, renewable."
+
+
+def test_headings_without_punctuation_start_their_own_clause():
+    before = "Section 1 Parties\nAcme LLC and Beta Inc.\n\nSection 2 Term\nThe term is one year.\nSection 3 Payment\nFees are due monthly.\n"
+    result = diff(before, before + "Section 4 Notices\nNotices are sent by email.\n")
+    assert result["clauses"]["before"] == 3
+    assert result["clauses"]["unchanged"] == 3
+    assert [clause["text"] for clause in result["added"]] == ["Section 4 Notices\nNotices are sent by email."]
+
+
+def test_risk_indicator_changes():
+    before = CONTRACT + "5. A penalty applies to late payment.\n6. Liability is unlimited liability.\n"
+    after = CONTRACT.replace("on notice.", "on notice, subject to a penalty.") + "5. Deposits are subject to forfeiture.\n"
+    changes = {change["indicator"]: change for change in diff(before, after)["risk"]["indicator_changes"]}
+    assert changes["forfeiture"]["status"] == "introduced"
+    assert changes["unlimited liability"]["status"] == "eliminated"
+    assert "penalty" not in changes
+
+
+def lcs_length(a, b):
+    lengths = [[0] * (len(b) + 1) for _ in range(len(a) + 1)]
+    for i in range(len(a) - 1, -1, -1):
+        for j in range(len(b) - 1, -1, -1):
+            lengths[i][j] = lengths[i + 1][j + 1] + 1 if a[i] == b[j] else max(lengths[i + 1][j], lengths[i][j + 1])
+    return lengths[0][0]
+
+
+def test_align_sequences_pairs_are_ordered_matches():
+    rng = random.Random(9)
+    for _ in range(300):
+        a = [rng.randrange(6) for _ in range(rng.randrange(30))]
+        b = [rng.randrange(6) for _ in range(rng.randrange(30))]
+        pairs = main.align_sequences(a, b)
+        assert all(a[i] == b[j] for i, j in pairs)
+        assert all(i0 < i1 and j0 < j1 for (i0, j0), (i1, j1) in zip(pairs, pairs[1:]))
+        assert len(pairs) <= lcs_length(a, b)
+
+
+def test_align_sequences_is_optimal_for_unique_items():
+    rng = random.Random(4)
+    for _ in range(300):
+        a = rng.sample(range(40), rng.randrange(25))
+        b = rng.sample(range(40), rng.randrange(25))
+        assert len(main.align_sequences(a, b)) == lcs_length(a, b)
+    assert main.align_sequences([1, 2, 3], [1, 2, 3]) == [(0, 0), (1, 1), (2, 2)]
+    assert main.align_sequences([], [1]) == []
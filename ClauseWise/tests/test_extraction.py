@@ -0,0 +1,134 @@
+import io
+import threading
+import zipfile
+
+import main
+
+
+def make_pdf(pages):
+    """A minimal PDF with one line of Helvetica text per page"""
+    objs = []
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(len(pages)))
+    objs.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>")
+    font = 3 + 2 * len(pages)
+    for i, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R /Resources << /Font << /F1 {font} 0 R >> >> >>")
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    objs.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs)+1}\n0000000000 65535 f \n".encode() + "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objs)+1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def test_pdf_pages_and_offsets():
+    text, offsets = main.extract_pdf_pages(make_pdf(["Page one contract", "Page two terms"]))
+    assert text == "Page one contract\nPage two terms"
+    assert offsets == [0, 18]
+
+
+def test_pdf_from_analysis_thread_uses_page_process():
+    # SIGALRM cannot time pages out on a worker thread, so they are extracted in a pool process
+    results = []
+    worker = threading.Thread(target=lambda: results.append(main.extract_pdf_pages(make_pdf(["Threaded page"]))))
+    worker.start()
+    worker.join()
+    assert results == [("Threaded page", [0])]
+    if main.PDF_PAGE_TIMEOUT > 0:
+        assert main.pdf_page_pool is not None
+
+
+def test_concurrent_pdf_extractions_each_get_a_page_process(monkeypatch):
+    monkeypatch.setattr(main.analysis_executor, "workers", 2)
+    monkeypatch.setattr(main, "pdf_page_pool", None)
+    results = {}
+    workers = [
+        threading.Thread(target=lambda name=name: results.__setitem__(name, main.extract_pdf_pages(make_pdf([f"{name} page"]))))
+        for name in ("First", "Second")
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert results == {"First": ("First page", [0]), "Second": ("Second page", [0])}
+        if main.PDF_PAGE_TIMEOUT > 0:
+            # One process per analysis thread, so neither upload waits behind the other
+            assert main.pdf_page_pool._max_workers >= 2
+    finally:
+        if main.pdf_page_pool is not None:
+            main.pdf_page_pool.shutdown()
+
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+MC = 'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+
+
+def make_docx(body: str, **parts: str) -> bytes:
+    """A DOCX package holding only the XML parts the extractor reads; parts maps e.g. header1 to its content"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {W} {MC}><w:body>{body}</w:body></w:document>")
+        for name, content in parts.items():
+            root = "hdr" if name.startswith("header") else "ftr"
+            archive.writestr(f"word/{name}.xml", f"<w:{root} {W}>{content}</w:{root}>")
+    return buffer.getvalue()
+
+
+def para(*runs: str) -> str:
+    return "<w:p>" + "".join(f"<w:r>{run}</w:r>" for run in runs) + "</w:p>"
+
+
+def text(value: str) -> str:
+    return f"<w:t>{value}</w:t>"
+
+
+def table(*rows) -> str:
+    return "<w:tbl>" + "".join(
+        "<w:tr>" + "".join(f"<w:tc>{cell}</w:tc>" for cell in row) + "</w:tr>" for row in rows
+    ) + "</w:tbl>"
+
+
+def test_docx_paragraphs_and_tables_in_order():
+    body = para(text("1. Parties")) + table([para(text("Fee")), para(text("$100"))], [para(text("Term")), para(text("1 year"))]) + para(text("2. Term"))
+    assert main.extract_text_from_docx(make_docx(body)) == "1. Parties\nFee\t$100\nTerm\t1 year\n2. Term"
+
+
+def test_docx_nested_table_rows_are_lines_of_the_enclosing_cell():
+    inner = table([para(text("a")), para(text("b"))], [para(text("c")), para(text("d"))])
+    body = table([para(text("Outer")) + inner, para(text("Right"))])
+    assert main.extract_text_from_docx(make_docx(body)) == "Outer\na\tb\nc\td\tRight"
+
+
+def test_docx_breaks_and_tabs():
+    body = (
+        para(text("one") + '<w:br/>' + text("two") + '<w:br w:type="page"/>' + text("three") + '<w:cr/>' + text("four"))
+        + '<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr>'
+        + '<w:r><w:t>Name</w:t><w:tab/><w:t>Value</w:t></w:r></w:p>'
+    )
+    assert main.extract_text_from_docx(make_docx(body)) == "one\ntwothree\nfour\nName\tValue"
+
+
+def test_docx_repeated_headers_and_footers_are_kept_once():
+    body = para(text("Body text"))
+    docx = make_docx(body, header1=para(text("ACME CONFIDENTIAL")), header2=para(text("ACME CONFIDENTIAL")),
+                     footer1=para(text("Page")) + para(text("Draft")), footer2=para(text("Draft")))
+    assert main.extract_text_from_docx(docx) == "Body text\nACME CONFIDENTIAL\nPage\nDraft"
+
+
+def test_docx_text_box_is_read_once_and_fallback_is_skipped():
+    text_box = f"<w:txbxContent>{para(text('Boxed note'))}</w:txbxContent>"
+    body = para(
+        text("Anchor")
+        + f"<mc:AlternateContent><mc:Choice Requires='wps'><w:drawing>{text_box}</w:drawing></mc:Choice>"
+        + f"<mc:Fallback><w:pict>{text_box}</w:pict></mc:Fallback></mc:AlternateContent>"
+        + text(" text")
+    )
+    assert main.extract_text_from_docx(make_docx(body)) == "Boxed note\nAnchor text"
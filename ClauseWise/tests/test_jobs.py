@@ -0,0 +1,44 @@
+import asyncio
+
+import main
+
+
+class Response:
+    def model_dump(self):
+        return {"document_id": "doc"}
+
+
+def test_job_state_is_visible_to_other_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    scheduler = main.JobScheduler(main.SQLiteDocumentStore(path), concurrency=1, backlog=4, ttl=60)
+    # A second store on the same file stands in for another uvicorn worker
+    other_worker = main.SQLiteDocumentStore(path)
+
+    async def work(report):
+        await report("analyzing", 0.5)
+        assert other_worker.get_job(job["job_id"])["stage"] == "analyzing"
+        return Response()
+
+    async def run():
+        nonlocal job
+        job = await scheduler.submit("a.txt", work)
+        assert other_worker.get_job(job["job_id"])["status"] == "queued"
+        await scheduler.queue.join()
+        scheduler.stop()
+
+    job = None
+    asyncio.run(run())
+    finished = other_worker.get_job(job["job_id"])
+    assert finished["status"] == "completed"
+    assert finished["result"] == {"document_id": "doc"}
+
+
+def test_finished_jobs_expire(tmp_path):
+    store = main.SQLiteDocumentStore(str(tmp_path / "jobs.db"))
+    scheduler = main.JobScheduler(store, concurrency=1, backlog=4, ttl=0)
+    store.put_job({"job_id": "old", "status": "completed", "updated_at": "2020-01-01T00:00:00"})
+    store.put_job({"job_id": "running", "status": "running", "updated_at": "2020-01-01T00:00:00"})
+    assert asyncio.run(scheduler.get("old")) is None
+    assert asyncio.run(scheduler.get("running"))["status"] == "running"
+    store.expire_jobs("2021-01-01")
+    assert store.get_job("old") is None and store.get_job("running") is not None
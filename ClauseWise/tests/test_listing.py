@@ -0,0 +1,120 @@
+import random
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+TYPES = ["Service Agreement", "NDA", "Lease"]
+
+
+def documents(count: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    return [{
+        "id": f"id{i:05d}", "filename": rng.choice(["a", "ab", "b", "contract"]) + f"{i}.txt", "text": "x. y",
+        "page_offsets": [0], "analysis": {"document_type": rng.choice(TYPES)}, "facts": None, "paragraphs": None,
+        "upload_time": f"2026-01-{1 + i // 40:02d}T{rng.randrange(24):02d}:00:00"
+    } for i in range(count)]
+
+
+def stores(tmp_path) -> list:
+    return [
+        main.MemoryDocumentStore(),
+        main.SQLiteDocumentStore(str(tmp_path / "listing.db")),
+        main.MemoryDocumentStore(max_entries=50, spill=main.SQLiteDocumentStore(str(tmp_path / "spill.db")))
+    ]
+
+
+def expected(docs: list, filters: dict, descending: bool) -> list:
+    summaries = [main.DocumentStore.summary(document) for document in docs]
+    kept = [
+        summary for summary in summaries
+        if (filters["document_type"] is None or summary["document_type"] == filters["document_type"])
+        and (filters["since"] is None or summary["upload_time"] >= filters["since"])
+        and (filters["until"] is None or summary["upload_time"] < filters["until"])
+        and (not filters["filename_prefix"] or summary["filename"].startswith(filters["filename_prefix"]))
+    ]
+    return [summary["document_id"] for summary in sorted(kept, key=main.DocumentListing.key, reverse=descending)]
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_pages_follow_the_requested_order(tmp_path, descending):
+    docs = documents(200)
+    backends = stores(tmp_path)
+    for document in docs:
+        for store in backends:
+            store.put(document)
+    rng = random.Random(2)
+    for document in rng.sample(docs, 20):
+        for store in backends:
+            assert store.delete(document["id"])
+        docs.remove(document)
+
+    for _ in range(30):
+        filters = dict(
+            document_type=rng.choice([None] + TYPES),
+            since=rng.choice([None, "2026-01-02", "2026-01-03T05:00:00"]),
+            until=rng.choice([None, "2026-01-05", "2026-01-04T12"]),
+            filename_prefix=rng.choice([None, "a", "ab", "contract1"])
+        )
+        limit = rng.choice([1, 7, 50, 1000])
+        for store in backends:
+            listed, after = [], None
+            while True:
+                page = store.page(limit + 1, after=after, descending=descending, **filters)
+                listed.extend(summary["document_id"] for summary in page[:limit])
+                if len(page) <= limit:
+                    break
+                after = main.DocumentListing.key(page[limit - 1])
+            assert listed == expected(docs, filters, descending)
+
+
+def test_filename_prefix_range(tmp_path):
+    assert main.prefix_upper_bound("ab") == "ac"
+    assert main.prefix_upper_bound("a\U0010ffff") == "b"
+    assert main.prefix_upper_bound("\ud7ff") == "\ue000"
+    assert main.prefix_upper_bound("\U0010ffff") is None
+    names = ["ab", "ab\U0010ffff.txt", "abc", "ac", "b", "\U0010ffff.txt"]
+    for store in stores(tmp_path):
+        for i, name in enumerate(names):
+            store.put({**documents(1)[0], "id": f"id{i}", "filename": name, "upload_time": f"2026-01-01T{i:02d}:00:00"})
+        for prefix in ["ab", "\U0010ffff", "a"]:
+            listed = [summary["filename"] for summary in store.page(10, filename_prefix=prefix)]
+            assert listed == [name for name in names if name.startswith(prefix)]
+
+
+def test_documents_endpoint_lists_newest_first(monkeypatch):
+    store = main.MemoryDocumentStore()
+    monkeypatch.setattr(main, "documents_store", store)
+    for hour, document in enumerate(documents(5)):
+        store.put({**document, "upload_time": f"2026-01-01T{hour:02d}:00:00"})
+    client = TestClient(main.app)
+
+    first = client.get("/documents", params={"limit": 3}).json()
+    assert [summary["document_id"] for summary in first["documents"]] == ["id00004", "id00003", "id00002"]
+    rest = client.get("/documents", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+    assert [summary["document_id"] for summary in rest["documents"]] == ["id00001", "id00000"]
+    oldest = client.get("/documents", params={"limit": 1, "order": "asc"}).json()
+    assert oldest["documents"][0]["document_id"] == "id00000"
+    assert client.get("/documents", params={"order": "newest"}).status_code == 422
+
+
+def test_memory_store_reads_wait_for_changes_in_progress():
+    store = main.MemoryDocumentStore()
+    first, second = documents(2)
+    store.put(first)
+    calls = [
+        lambda: store.page(10),
+        lambda: store.get(first["id"]),
+        lambda: store.put(second),
+        lambda: store.delete(first["id"]),
+    ]
+    for call in calls:
+        thread = threading.Thread(target=call)
+        with store.lock:
+            thread.start()
+            thread.join(0.05)
+            assert thread.is_alive()
+        thread.join()
+    assert [summary["document_id"] for summary in store.page(10)] == [second["id"]]
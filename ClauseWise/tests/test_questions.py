@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+import main
+
+CONTRACT = (
+    "1. Term\nThis agreement runs for one year.\n\n"
+    "2. Termination\nEither party may terminate on 30 days notice.\n\n"
+    "3. Liability\nLiability is limited to fees paid.\n"
+)
+
+
+def stored(document_id: str) -> dict:
+    return {
+        "id": document_id, "filename": f"{document_id}.txt", "text": CONTRACT, "page_offsets": [0],
+        "analysis": {"document_type": "Service Agreement"}, "facts": None, "paragraphs": None,
+        "upload_time": datetime.now().isoformat()
+    }
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_missing_fact_sheet_is_built_once_and_stored(backend, tmp_path, monkeypatch):
+    store = main.MemoryDocumentStore() if backend == "memory" else main.SQLiteDocumentStore(str(tmp_path / "facts.db"))
+    monkeypatch.setattr(main, "documents_store", store)
+    monkeypatch.setattr(main, "sentence_indexes", main.SentenceIndexCache(8))
+    store.put(stored("a"))
+    scans = []
+    scan = main.analyzer.scan
+    monkeypatch.setattr(main.analyzer, "scan", lambda text: scans.append(text) or scan(text))
+
+    first = main.answer_stored_question("a", "what are the termination terms")
+    assert len(scans) == 1
+    assert store.get("a")["facts"] is not None
+    assert main.answer_stored_question("a", "what are the termination terms") == first
+    assert len(scans) == 1
+    assert [node["title"] for node in main.find_clauses(store.get("a")["facts"], "liability")] == ["3. Liability"]
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_warm_question_does_not_read_the_document(backend, tmp_path, monkeypatch):
+    store = main.MemoryDocumentStore() if backend == "memory" else main.SQLiteDocumentStore(str(tmp_path / "warm.db"))
+    monkeypatch.setattr(main, "documents_store", store)
+    monkeypatch.setattr(main, "sentence_indexes", main.SentenceIndexCache(8))
+    store.put(stored("a"))
+    main.answer_stored_question("a", "what are the termination terms")
+    reads = []
+    get = store.get
+    monkeypatch.setattr(store, "get", lambda document_id: reads.append(document_id) or get(document_id))
+
+    answer = main.answer_stored_question("a", "what is the liability")
+    assert reads == []
+    assert "Liability is limited" in answer["answer"]
+
+    main.sentence_indexes.discard("a")
+    main.answer_stored_question("a", "what is the liability")
+    assert reads == ["a"]
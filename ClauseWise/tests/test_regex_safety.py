@@ -0,0 +1,105 @@
+import random
+import time
+
+import pytest
+
+import main
+
+KB = 1024
+# Generous enough for a slow CI machine; a pattern that backtracks over a run takes minutes here
+SECONDS_PER_MB = 10
+
+
+def repeat(unit: str, size: int) -> str:
+    return (unit * (size // len(unit) + 1))[:size]
+
+
+def ocr_garbage(size: int) -> str:
+    rng = random.Random(7)
+    return "".join(rng.choice("Il1|O0o.,;:-_/\\$%&'\" \n\tABCxyz§") for _ in range(size))
+
+
+ADVERSARIAL = {
+    "all caps": lambda size: repeat("THIS AGREEMENT IS MADE BETWEEN ACME HOLDINGS CORPORATION AND ", size),
+    "one long word": lambda size: "A" * size,
+    "slashed numbers": lambda size: repeat("1/", size),
+    "repeated liability": lambda size: repeat("liability ", size),
+    "unterminated amount": lambda size: "$" + repeat("1,", size - 1),
+    "spaces after a heading word": lambda size: "Section" + " " * (size - 7),
+    "numbered lines": lambda size: repeat("1.\n", size),
+    "ocr garbage": ocr_garbage,
+}
+
+
+def contract(clauses: int, seed: int) -> str:
+    """A contract-shaped text with headings, parties, dates, amounts and legal terms"""
+    rng = random.Random(seed)
+    topics = ["Termination", "Liability", "Payment Terms", "Confidentiality", "Governing Law", "Force Majeure"]
+    parts = ["This Service Agreement is made between Acme Holdings LLC and Beta Services Inc.\n\n"]
+    for number in range(1, clauses + 1):
+        topic = rng.choice(topics)
+        parts.append(f"Section {number}. {topic}\n")
+        parts.append(
+            f"The fee of ${rng.randint(1, 99)},{rng.randint(100, 999)}.00 is due on "
+            f"{rng.choice(['January', 'March', 'July'])} {rng.randint(1, 28)}, 20{rng.randint(10, 30)}. "
+            f"Either party may terminate for breach of contract on {rng.randint(10, 90)} days written notice, "
+            f"and liability is limited to fees paid in the prior 12/31/2024 period.\n\n"
+        )
+    return "".join(parts)
+
+
+def features(found: main.DocumentFeatures) -> tuple:
+    return (found.parties, found.dates, found.amounts, found.section_headers,
+            found.keyword_offsets, found.legal_issues, found.word_count)
+
+
+@pytest.mark.parametrize("name", ADVERSARIAL)
+def test_adversarial_input_scans_in_linear_time(name):
+    make = ADVERSARIAL[name]
+    timings = []
+    for size in (128 * KB, 512 * KB):
+        text = make(size)
+        started = time.perf_counter()
+        main.analyzer.scan(text)
+        main.scan_paragraphs(text)
+        timings.append(time.perf_counter() - started)
+    assert timings[1] / 0.5 < SECONDS_PER_MB
+    # Four times the text may take four times as long, not sixteen
+    assert timings[1] < 8 * timings[0] + 0.1
+
+
+@pytest.mark.parametrize("window, overlap", [(997, 300), (2500, 700), (64 * KB, 4096)])
+def test_windowed_scan_matches_full_scan(window, overlap):
+    # Only matches shorter than the overlap are guaranteed, which rules out a 20KB amount
+    texts = [contract(40, seed) for seed in range(3)] + [
+        make(20 * KB) for name, make in ADVERSARIAL.items() if name != "unterminated amount"
+    ]
+    for text in texts:
+        expected = features(main.analyzer.scanner.scan_chunks([text], 0))
+        assert features(main.analyzer.scanner.scan_chunks(main.text_windows(text, window), overlap)) == expected
+
+
+def test_uneven_chunks_match_full_scan():
+    rng = random.Random(5)
+    for seed in range(5):
+        text = contract(30, seed)
+        cuts = sorted(rng.sample(range(len(text) + 1), 6))
+        chunks = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert features(main.analyzer.scanner.scan_chunks(chunks, 300)) == features(main.analyzer.scan(text))
+
+
+def test_paragraph_scan_matches_full_scan():
+    for text in [contract(40, seed) for seed in range(3)] + [make(20 * KB) for make in ADVERSARIAL.values()]:
+        found, records, report = main.scan_paragraphs(text)
+        assert features(found) == features(main.analyzer.scan(text))
+        assert report["paragraphs"] == len(main.paragraph_spans(text))
+
+
+def test_paragraph_scan_reuses_findings_after_an_edit():
+    text = contract(40, 1)
+    _, records, _ = main.scan_paragraphs(text)
+    edited = text.replace("Section 7. ", "Section 7. Amended ", 1) + "Section 41. Notices\nNotices go to Gamma Partners LLP.\n"
+    found, _, report = main.scan_paragraphs(edited, records)
+    assert features(found) == features(main.analyzer.scan(edited))
+    assert report["reused_paragraphs"] > 0
+    assert report["rescanned_paragraphs"] > 0
@@ -0,0 +1,39 @@
+import re
+
+import main
+
+
+def reference_entities(text):
+    """Dates and amounts found the way extract_entities did before the single-pass scan"""
+    dates = []
+    for pattern in main.analyzer.date_patterns:
+        dates.extend(re.findall(pattern.replace("++", "+"), text, re.IGNORECASE))
+    return dates, re.findall(main.analyzer.money_pattern.replace("++", "+"), text)
+
+
+def test_dates_and_amounts_inside_section_heading():
+    text = "Section 5: The fee of $5,000 is payable on January 5, 2024 by the tenant"
+    features = main.analyzer.scan(text)
+    entities = main.analyzer.extract_entities(features)
+    assert entities["dates"] == ["January 5, 2024"]
+    assert entities["amounts"] == ["$5,000"]
+    assert features.section_headers == ["The fee of $5,000 is payable on January 5, 2024 by the tenant"]
+
+
+def test_date_running_past_section_title():
+    # The title stops at 100 characters, in the middle of the date
+    text = "Article 2: " + "x" * 90 + " due 12/31/2025 unless renewed"
+    features = main.analyzer.scan(text)
+    assert features.dates == ["12/31/2025"]
+
+
+def test_entities_match_reference_across_headings():
+    text = (
+        "ARTICLE 1 - Payment terms of $1,200.50 due 1/2/2024.\n"
+        "Termination on 3 March 2025 costs $300.\n"
+        "Clause 7: Liability capped at $10,000 from June 1, 2024 onwards\n"
+    )
+    features = main.analyzer.scan(text)
+    dates, amounts = reference_entities(text)
+    assert sorted(features.dates) == sorted(set(dates))
+    assert sorted(features.amounts) == sorted(set(amounts))
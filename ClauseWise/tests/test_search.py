@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import main
+
+
+def stored(document_id: str, text: str, upload_time: str) -> dict:
+    return {
+        "id": document_id, "filename": f"{document_id}.txt", "text": text, "page_offsets": [0],
+        "analysis": {"document_type": "Service Agreement"}, "facts": None, "paragraphs": None,
+        "upload_time": upload_time
+    }
+
+
+def test_sync_picks_up_other_workers_uploads_and_deletions(tmp_path):
+    path = str(tmp_path / "search.db")
+    other_worker = main.SQLiteDocumentStore(path)
+    store = main.SQLiteDocumentStore(path)
+    index = main.SearchIndex(sync_interval=5, lookback=60)
+    now = datetime.now()
+
+    other_worker.put(stored("a", "The arbitration clause applies.", (now - timedelta(hours=1)).isoformat()))
+    other_worker.put(stored("b", "Termination requires notice.", now.isoformat()))
+    index.sync(store)
+    assert {document_id for document_id, _ in index.search(["arbitration", "termination"], 10)} == {"a", "b"}
+
+    # A late commit with an upload_time just behind the watermark is still found
+    other_worker.put(stored("c", "Arbitration in London.", (now - timedelta(seconds=1)).isoformat()))
+    other_worker.delete("a")
+    index.sync(store)
+    assert [document_id for document_id, _ in index.search(["arbitration"], 10)] == ["c"]
+    assert index.stats()["documents"] == 2
+
+
+def test_sync_does_not_fill_the_sentence_index_cache(tmp_path):
+    store = main.SQLiteDocumentStore(str(tmp_path / "search.db"))
+    store.put(stored("d", "Liability is limited.", datetime.now().isoformat()))
+    index = main.SearchIndex(sync_interval=5, lookback=60)
+    index.sync(store)
+    assert "d" not in main.sentence_indexes.entries
+    assert index.search(["liability"], 1)[0][0] == "d"
@@ -0,0 +1,55 @@
+import pickle
+
+import pytest
+
+import main
+
+CONTRACT = (
+    "This Service Agreement is made between Acme Holdings LLC and Beta Services Inc. "
+    "Either party may terminate on 30 days written notice. "
+    "Liability is limited to the “fees” paid in the prior 12 months. "
+    "Notice of a claim must be given within 90 days. "
+    "The “Provider” — not the Client — carries liability for its subcontractors."
+)
+
+
+@pytest.mark.parametrize("text", [
+    "Plain ASCII contract text. " * 20,
+    "The “Tenant” shall pay – in full – €1.000 or ¥5,000 … " * 20,
+    "Emoji 🙂 and CJK 契約 text " * 20,
+])
+def test_compact_text_slices_like_str(text):
+    compact = main.CompactText(text)
+    assert len(compact) == len(text)
+    assert str(compact) == text
+    for start, stop in [(0, 0), (0, 1), (5, 64), (63, 65), (64, 128), (100, len(text)), (-30, -1), (len(text), len(text) + 5)]:
+        assert compact[start:stop] == text[start:stop]
+    assert compact[::3] == text[::3]
+    assert compact[7] == text[7]
+    assert compact[-1] == text[-1]
+    with pytest.raises(IndexError):
+        compact[len(text)]
+    assert str(main.CompactText.from_utf8(text.encode("utf-8"))) == text
+    assert str(pickle.loads(pickle.dumps(compact))) == text
+
+
+def test_sentence_index_over_compact_text():
+    # Long enough that sentences straddle the blocks CompactText decodes
+    text = " ".join([CONTRACT] * 20)
+    plain, compact = main.SentenceIndex(text), main.SentenceIndex(main.CompactText(text))
+    assert len(plain) == len(compact)
+    assert [plain.sentence(i) for i in range(len(plain))] == [compact.sentence(i) for i in range(len(compact))]
+    assert plain.rank(["liability", "notice"], 5) == compact.rank(["liability", "notice"], 5)
+
+
+def test_cached_and_stored_paragraphs_are_the_same_packed_blob():
+    text = "\n\n".join(f"{number}. Clause\nEither party may terminate on {number} days notice." for number in range(1, 30))
+    result = main.analyze_upload(text)
+    blob = result["paragraphs"]
+    assert isinstance(blob, bytes)
+    assert main.AnalysisCache.entry_size(result) > len(blob)
+    store = main.MemoryDocumentStore()
+    store.put({"id": "a", "filename": "a.txt", "text": result["text"], "page_offsets": [0], "analysis": result["analysis"],
+               "facts": result["facts"], "paragraphs": blob, "upload_time": "2026-01-01T00:00:00"})
+    assert store.get("a")["paragraphs"] is blob
+    assert store.get_paragraphs("a") == main.unpack_paragraphs(blob)